@@ -1,13 +1,18 @@
 import streamlit as st
-import pydeck as pdk
 from datetime import date, datetime, timedelta
-import geemap
 import ee
-from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor, wait
 import streamlit_folium as st_folium
 import folium
 import requests
 import json
+import hashlib
+import functools
+import os
+import tempfile
+import threading
+import numpy as np
 
 # Custom CSS for better aesthetics
 st.set_page_config(
@@ -17,8 +22,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
+# Custom CSS, defined once; the cards below only reference its classes
+_CSS = """
 <style>
     .main-header {
         background: linear-gradient(90deg, #1f77b4, #ff7f0e);
@@ -57,6 +62,13 @@ st.markdown("""
         color: white;
         margin: 1rem 0;
     }
+    .date-card {
+        text-align: center;
+        padding: 1rem;
+        background: #f8f9fa;
+        border-radius: 10px;
+        margin: 1rem 0;
+    }
     .sidebar-header {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
         padding: 1rem;
@@ -105,23 +117,23 @@ st.markdown("""
         color: #1f77b4;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+_METRIC_CARD = ("<h4>{emoji} {label}</h4><p><strong>Start:</strong> {start:.3f}</p>"
+                "<p><strong>End:</strong> {end:.3f}</p><p><strong>Change:</strong> {change:.3f}</p>")
+
+def card(cls, html):
+    st.markdown(f'<div class="{cls}">{html}</div>', unsafe_allow_html=True)
+
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # Main header
-st.markdown("""
-<div class="main-header">
-    <h1>🌍 Urban Sprawl Analysis Tool</h1>
-    <p>Advanced satellite imagery analysis for environmental monitoring and urban development assessment</p>
-</div>
-""", unsafe_allow_html=True)
+card("main-header", "<h1>🌍 Urban Sprawl Analysis Tool</h1>"
+     "<p>Advanced satellite imagery analysis for environmental monitoring and urban development assessment</p>")
 
 # Sidebar styling
 with st.sidebar:
-    st.markdown("""
-    <div class="sidebar-header">
-        <h3>⚙️ Configuration</h3>
-    </div>
-    """, unsafe_allow_html=True)
+    card("sidebar-header", "<h3>⚙️ Configuration</h3>")
     
     st.markdown("### 📅 Timeframe Selection")
     col1, col2 = st.columns(2)
@@ -136,110 +148,219 @@ with st.sidebar:
     st.markdown("### 🗺️ Area Selection")
     st.markdown("Draw a rectangle or polygon on the map to select your area of interest.")
 
-# Default map center
-map_center = [20.0, 0.0]
-
-m = folium.Map(location=map_center, zoom_start=2, control_scale=True)
-
-# Add drawing tools
-draw = folium.plugins.Draw(export=True, draw_options={
+# Drawing tools offered on the area-selection map
+_DRAW_OPTIONS = {
     'polyline': False,
     'circle': False,
     'marker': False,
     'circlemarker': False,
     'rectangle': True,
     'polygon': True
-})
-draw.add_to(m)
+}
 
-# Show map and capture drawing
-output = st_folium.st_folium(m, width=700, height=450, returned_objects=["last_active_drawing", "all_drawings"])
+@st.cache_resource
+def get_base_map():
+    # The base map and Draw plugin don't depend on any input, so build them once
+    # per process and share them across reruns and sessions. Nothing adds children
+    # to the map after this, so callers can use the shared object without copying.
+    m = folium.Map(location=[20.0, 0.0], zoom_start=2, control_scale=True)
+    folium.plugins.Draw(export=True, draw_options=_DRAW_OPTIONS).add_to(m)
+    return m
 
-# Parse drawn geometry
-geometry = None
+m = get_base_map()
+
+# Show map and capture drawing. Only the active drawing is returned, so panning
+# and zooming the map no longer trigger a rerun.
+output = st_folium.st_folium(m, key="aoi_map", width=700, height=450,
+                             returned_objects=["last_active_drawing"], use_container_width=False)
+
+# Parse drawn geometry, keeping it in session state across reruns
 if output and output.get("last_active_drawing"):
-    geometry = output["last_active_drawing"]["geometry"]
+    drawn = output["last_active_drawing"]["geometry"]
+    if drawn != st.session_state.get("geometry"):
+        st.session_state["geometry"] = drawn
+geometry = st.session_state.get("geometry")
+
+EE_PROJECT = 'seraphic-music-467101-s2'
+
+# Saved analyses: composites exported as EE assets plus their statistics
+ASSET_ROOT = f'projects/{EE_PROJECT}/assets'
+SAVED_ANALYSES_PATH = os.path.join('results', 'saved_analyses.json')
+# Export states after which a saved analysis will never become ready
+_EXPORT_FAILED_STATES = {'FAILED', 'CANCEL_REQUESTED', 'CANCELLED', 'UNKNOWN'}
+
+@st.cache_resource(show_spinner=False)
+def _saved_analyses_lock():
+    # Streamlit re-executes this module on every rerun, so the lock lives in
+    # the resource cache to be shared by all sessions and worker threads
+    return threading.Lock()
+
+SAVED_ANALYSES_LOCK = _saved_analyses_lock()
 
 # --- Authenticate and Initialize GEE ---
+@st.cache_resource(show_spinner=False)
+def _initialize_ee():
+    # Runs once per process. Failures raise, so they are not cached and the
+    # next call tries again. No st.* output here: Streamlit would replay it on
+    # every cache hit.
+    ee.Initialize(project=EE_PROJECT)
+    return True
+
 def gee_authenticate():
     try:
-        ee.Initialize(project='seraphic-music-467101-s2')
-    except Exception as e:
+        return _initialize_ee()
+    except Exception:
         st.warning("Authenticating with Google Earth Engine...")
-        try:
-            ee.Authenticate()
-            ee.Initialize(project='seraphic-music-467101-s2')
-        except Exception as e:
-            st.error(f"GEE Authentication failed: {e}")
-            return False
-    return True
-
-def get_s2_composite(min_lat, max_lat, min_lon, max_lon, start_date, end_date):
+    try:
+        ee.Authenticate()
+        return _initialize_ee()
+    except Exception as e:
+        st.error(f"GEE Authentication failed: {e}")
+        return False
+
+# --- Cached Earth Engine helpers ---
+# Streamlit re-runs this script on every widget interaction. Everything below is
+# keyed on the (quantized) bounding box and dates, so repeat analyses of the same
+# area and timeframe are served from cache instead of Earth Engine.
+def snap_bbox(min_lat, max_lat, min_lon, max_lon, ndigits=4):
+    # ~11 m at 4 decimals: well below Sentinel-2 resolution, but coarse enough
+    # that redrawing roughly the same area produces the same cache keys
+    return tuple(round(v, ndigits) for v in (min_lat, max_lat, min_lon, max_lon))
+
+def snap_polygon(coords, ndigits=4):
+    return tuple((round(lon, ndigits), round(lat, ndigits)) for lon, lat in coords)
+
+def get_region(min_lat, max_lat, min_lon, max_lon, polygon=None):
+    if polygon is not None:
+        return ee.Geometry.Polygon([list(polygon)])
+    return ee.Geometry.Rectangle([min_lon, min_lat, max_lon, max_lat])
+
+def select_period(collection, start_date, end_date):
+    # Images for the exact dates, or a +/-30 day window if there are none.
+    # The fallback is decided server-side so it costs no extra round-trip.
+    exact = collection.filterDate(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+    broad = collection.filterDate(
+        (start_date - timedelta(days=30)).strftime('%Y-%m-%d'),
+        (end_date + timedelta(days=30)).strftime('%Y-%m-%d')
+    )
+    return ee.ImageCollection(ee.Algorithms.If(exact.size().gt(0), exact, broad))
+
+def analysis_key(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon=None):
+    raw = json.dumps([min_lat, max_lat, min_lon, max_lon, [str(d) for d in period1 + period2], polygon])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def load_saved_analyses():
+    if not os.path.exists(SAVED_ANALYSES_PATH):
+        return {}
+    with open(SAVED_ANALYSES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_saved_analyses(saved):
+    # Write to a temp file and swap it in, so readers never see a partial file
+    directory = os.path.dirname(SAVED_ANALYSES_PATH)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2)
+        os.replace(tmp_path, SAVED_ANALYSES_PATH)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def store_saved_analysis(key, record):
+    with SAVED_ANALYSES_LOCK:
+        saved = load_saved_analyses()
+        saved[key] = record
+        _write_saved_analyses(saved)
+
+def discard_saved_analysis(key):
+    with SAVED_ANALYSES_LOCK:
+        saved = load_saved_analyses()
+        if saved.pop(key, None) is not None:
+            _write_saved_analyses(saved)
+
+def get_saved_assets(key):
+    # Asset IDs for a saved analysis once its export tasks have finished, else None
+    record = load_saved_analyses().get(key)
+    if record is None:
+        return None
+    if not record.get('ready'):
+        states = [status['state'] for status in ee.data.getTaskStatus(record['task_ids'])]
+        if any(state in _EXPORT_FAILED_STATES for state in states):
+            # The export will never finish: forget it so the analysis can be saved again
+            discard_saved_analysis(key)
+            return None
+        if any(state != 'COMPLETED' for state in states):
+            return None
+        record['ready'] = True
+        store_saved_analysis(key, record)
+        # Composites and previews cached before the export finished are still the
+        # median versions; drop them so the next run loads the saved assets
+        get_two_composites.clear()
+        get_s2_preview_urls.clear()
+    return record['assets']
+
+@st.cache_resource(show_spinner=False, ttl=3600)
+def get_period_collections(min_lat, max_lat, min_lon, max_lon, period1, period2):
     # Define area of interest
-    aoi = ee.Geometry.Rectangle([min_lon, min_lat, max_lon, max_lat])
-    
-    # Convert dates to proper format for Earth Engine
-    start_date_str = start_date.strftime('%Y-%m-%d')
-    end_date_str = end_date.strftime('%Y-%m-%d')
-    
-    # Add some debug info
-    st.info(f"Searching for images from {start_date_str} to {end_date_str}")
-    
-    # Sentinel-2 surface reflectance collection
+    aoi = get_region(min_lat, max_lat, min_lon, max_lon)
+
+    # Sentinel-2 surface reflectance collection, shared by both periods
     collection = (
         ee.ImageCollection('COPERNICUS/S2_SR')
         .filterBounds(aoi)
-        .filterDate(start_date_str, end_date_str)
         .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
     )
-    
-    # Check if collection has any images
-    count = collection.size().getInfo()
-    st.info(f"Found {count} images for the specified date range")
-    
-    if count == 0:
-        # If no images found for exact dates, try a broader date range
-        start_date_broad = start_date - timedelta(days=30)
-        end_date_broad = end_date + timedelta(days=30)
-        start_date_broad_str = start_date_broad.strftime('%Y-%m-%d')
-        end_date_broad_str = end_date_broad.strftime('%Y-%m-%d')
-        
-        st.info(f"No images found for exact dates. Trying broader range: {start_date_broad_str} to {end_date_broad_str}")
-        
-        collection = (
-            ee.ImageCollection('COPERNICUS/S2_SR')
-            .filterBounds(aoi)
-            .filterDate(start_date_broad_str, end_date_broad_str)
-            .filter(ee.Filter.lt('CLOUDY_PIXEL_PERCENTAGE', 20))
-        )
-        
-        count = collection.size().getInfo()
-        st.info(f"Found {count} images for the broader date range")
-    
-    if count == 0:
-        raise Exception(f"No Sentinel-2 images found for the area and date range. Try selecting a different area or time period.")
-    
-    # Median composite
-    composite = collection.median().clip(aoi)
-    return composite
-
-def get_s2_url(composite, min_lat, max_lat, min_lon, max_lon):
-    vis_params = {
-        'bands': ['B4', 'B3', 'B2'],  # RGB
-        'min': 0,
-        'max': 3000,
-        'gamma': 1.2
-    }
-    url = composite.getThumbURL({
-        'min': 0,
-        'max': 3000,
-        'dimensions': 512,
-        'region': [[min_lon, min_lat], [min_lon, max_lat], [max_lon, max_lat], [max_lon, min_lat]],
-        'format': 'png',
-        'bands': ['B4', 'B3', 'B2'],
-        'gamma': 1.2
-    })
-    return url
+    # No size() probe here: an empty period shows up as null statistics in
+    # compute_indices, which saves a blocking round-trip per analysis
+    return select_period(collection, *period1), select_period(collection, *period2)
+
+@st.cache_resource(show_spinner=False, ttl=3600)
+def get_two_composites(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon=None):
+    # Median composites, used for the NDVI/NDBI statistics. Saved analyses load
+    # the exported rasters instead of recomputing the median.
+    assets = get_saved_assets(analysis_key(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon))
+    if assets is not None:
+        return tuple(ee.Image(asset_id) for asset_id in assets)
+
+    aoi = get_region(min_lat, max_lat, min_lon, max_lon)
+    collections = get_period_collections(min_lat, max_lat, min_lon, max_lon, period1, period2)
+    return tuple(collection.median().clip(aoi) for collection in collections)
+
+# True-colour visualization for the Sentinel-2 previews
+_PREVIEW_VIS = {
+    'bands': ['B4', 'B3', 'B2'],  # RGB
+    'min': 0,
+    'max': 3000,
+    'gamma': 1.2
+}
+
+def get_s2_tile_url(composite, vis):
+    # XYZ tile template served from EE's tile cache, for use as a Leaflet layer
+    return composite.getMapId(vis)['tile_fetcher'].url_format
+
+@st.cache_data(show_spinner=False, ttl=3600)
+def get_s2_preview_urls(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon=None):
+    # The RGB preview only needs a visually clean image, so use a mosaic (least
+    # cloudy scene on top) rather than a per-pixel median, which is much slower
+    # to render. Saved analyses render straight from the stored composites.
+    assets = get_saved_assets(analysis_key(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon))
+    if assets is not None:
+        previews = [ee.Image(asset_id) for asset_id in assets]
+    else:
+        aoi = get_region(min_lat, max_lat, min_lon, max_lon)
+        collections = get_period_collections(min_lat, max_lat, min_lon, max_lon, period1, period2)
+        previews = [collection.sort('CLOUDY_PIXEL_PERCENTAGE', False).mosaic().clip(aoi) for collection in collections]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        return tuple(executor.map(lambda preview: get_s2_tile_url(preview, _PREVIEW_VIS), previews))
+
+def preview_map(tile_url, min_lat, max_lat, min_lon, max_lon):
+    # Small zoomable map with the Sentinel-2 tiles over the selected area
+    m = folium.Map(control_scale=True)
+    folium.TileLayer(tiles=tile_url, attr='Google Earth Engine', name='Sentinel-2', overlay=True).add_to(m)
+    m.fit_bounds([[min_lat, min_lon], [max_lat, max_lon]])
+    return m
 
 def calculate_ndvi(image):
     # NDVI = (NIR - RED) / (NIR + RED)
@@ -251,75 +372,146 @@ def calculate_builtup(image):
     ndbi = image.normalizedDifference(['B11', 'B8']).rename('NDBI')
     return ndbi
 
-def get_mean_stat(image, band, region):
-    stats = image.reduceRegion(
+@st.cache_data(show_spinner=False, ttl=3600)
+def compute_indices(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon=None):
+    # Mean NDVI/NDBI for both periods from a single reduceRegion round-trip
+    record = load_saved_analyses().get(analysis_key(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon))
+    if record is not None:
+        return tuple(record['means'])
+
+    composite1, composite2 = get_two_composites(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon)
+    region = get_region(min_lat, max_lat, min_lon, max_lon, polygon)
+
+    stacked = (
+        calculate_ndvi(composite1).rename('ndvi1')
+        .addBands(calculate_ndvi(composite2).rename('ndvi2'))
+        .addBands(calculate_builtup(composite1).rename('ndbi1'))
+        .addBands(calculate_builtup(composite2).rename('ndbi2'))
+    )
+    stats = stacked.reduceRegion(
         reducer=ee.Reducer.mean(),
         geometry=region,
         scale=30,
-        maxPixels=1e9
-    )
-    return stats.get(band)
+        maxPixels=1e9,
+        bestEffort=True,
+        tileScale=4
+    ).getInfo()
+
+    means = tuple(stats.get(band) for band in ('ndvi1', 'ndvi2', 'ndbi1', 'ndbi2'))
+    if None in means:
+        raise Exception(f"No Sentinel-2 images found for the area and date range. Try selecting a different area or time period.")
+    return means
+
+def save_analysis(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon, means):
+    # Export both median composites as EE assets and record them with the
+    # statistics, so the next analysis of this area and timeframe skips the
+    # median reduction entirely
+    key = analysis_key(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon)
+    if key in load_saved_analyses():
+        return key
+
+    composites = get_two_composites(min_lat, max_lat, min_lon, max_lon, period1, period2, polygon)
+    region = get_region(min_lat, max_lat, min_lon, max_lon)
+
+    assets, task_ids = [], []
+    for i, composite in enumerate(composites, 1):
+        asset_id = f'{ASSET_ROOT}/urban_sprawl_{key}_{i}'
+        task = ee.batch.Export.image.toAsset(
+            image=composite.select(['B2', 'B3', 'B4', 'B8', 'B11']),
+            description=f'urban_sprawl_{key}_{i}',
+            assetId=asset_id,
+            region=region,
+            scale=30,
+            maxPixels=1e13
+        )
+        task.start()
+        assets.append(asset_id)
+        task_ids.append(task.id)
+
+    store_saved_analysis(key, {
+        'assets': assets,
+        'task_ids': task_ids,
+        'ready': False,
+        'means': list(means)
+    })
+    return key
+
+def run_parallel(*calls):
+    # Run independent Earth Engine requests concurrently. Worker threads share
+    # this session's script context so cached functions behave as on the main thread.
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=len(calls), initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        futures = [executor.submit(fn, *args) for fn, *args in calls]
+        wait(futures)
+    return [future.result() for future in futures]
 
 # --- GPT-4.1 Summary Section ---
+# Trend buckets, searched with side='right':
+# (-inf, -0.05) | [-0.05, 0) | [0, 0] | (0, 0.05] | (0.05, inf)
+_CHANGE_BINS = np.array([-0.05, 0.0, np.nextafter(0.0, 1.0), np.nextafter(0.05, 1.0)])
+
+_NDVI_PHRASES = (
+    ("significant vegetation decline", "This indicates environmental degradation, possibly due to deforestation, urban expansion, or climate change impacts."),
+    ("moderate vegetation decline", "This suggests slight reduction in vegetation cover, possibly due to seasonal changes or minor land use changes."),
+    ("stable vegetation conditions", "Vegetation cover has remained relatively stable during the analysis period."),
+    ("moderate vegetation growth", "This suggests slight improvement in vegetation cover, possibly due to seasonal changes or minor land management improvements."),
+    ("significant vegetation growth", "This indicates improved environmental conditions, possibly due to reforestation, better land management, or natural recovery."),
+)
+
+_NDBI_PHRASES = (
+    ("significant urban decline", "This indicates reduction in built-up areas, possibly due to demolition, land restoration, or natural disasters."),
+    ("moderate urban decline", "This suggests some reduction in built-up areas, possibly due to minor land use changes or seasonal variations."),
+    ("stable urban conditions", "Built-up areas have remained relatively stable during the analysis period."),
+    ("moderate urban expansion", "This suggests some increase in built-up areas, possibly due to gradual urban development or infrastructure improvements."),
+    ("significant urban expansion", "This indicates substantial built-up area growth, likely due to urban development, infrastructure projects, or land use changes."),
+)
+
+# (problems, solutions) per conservation priority; anything else reads as "Low"
+_PRIORITY_PHRASES = {
+    "High": (
+        "High conservation priority indicates significant environmental concerns, including potential habitat loss, biodiversity decline, and ecosystem degradation.",
+        "Immediate conservation measures recommended: establish protected areas, implement sustainable land use policies, promote reforestation, and monitor environmental impacts."
+    ),
+    "Medium": (
+        "Medium conservation priority suggests moderate environmental concerns that require attention to prevent further degradation.",
+        "Recommended actions: implement sustainable development practices, establish monitoring programs, promote green infrastructure, and engage in community conservation efforts."
+    ),
+    "Low": (
+        "Low conservation priority indicates relatively stable environmental conditions, but continued monitoring is important.",
+        "Maintain current environmental conditions through sustainable practices, regular monitoring, and community awareness programs."
+    ),
+}
+
+_DIRECTIONS = ('decrease', 'no change', 'increase')
+
 def generate_template_summary(summary_data):
     """Generate a template summary based on analysis results without external API"""
-    
-    ndvi_change = summary_data.get('ndvi_change', 0)
-    ndbi_change = summary_data.get('ndbi_change', 0)
-    priority = summary_data.get('conservation_priority', 'Unknown')
-    
-    # Determine vegetation trend
-    if ndvi_change > 0.05:
-        veg_trend = "significant vegetation growth"
-        veg_reason = "This indicates improved environmental conditions, possibly due to reforestation, better land management, or natural recovery."
-    elif ndvi_change > 0:
-        veg_trend = "moderate vegetation growth"
-        veg_reason = "This suggests slight improvement in vegetation cover, possibly due to seasonal changes or minor land management improvements."
-    elif ndvi_change < -0.05:
-        veg_trend = "significant vegetation decline"
-        veg_reason = "This indicates environmental degradation, possibly due to deforestation, urban expansion, or climate change impacts."
-    elif ndvi_change < 0:
-        veg_trend = "moderate vegetation decline"
-        veg_reason = "This suggests slight reduction in vegetation cover, possibly due to seasonal changes or minor land use changes."
-    else:
-        veg_trend = "stable vegetation conditions"
-        veg_reason = "Vegetation cover has remained relatively stable during the analysis period."
-    
-    # Determine urban development trend
-    if ndbi_change > 0.05:
-        urban_trend = "significant urban expansion"
-        urban_reason = "This indicates substantial built-up area growth, likely due to urban development, infrastructure projects, or land use changes."
-    elif ndbi_change > 0:
-        urban_trend = "moderate urban expansion"
-        urban_reason = "This suggests some increase in built-up areas, possibly due to gradual urban development or infrastructure improvements."
-    elif ndbi_change < -0.05:
-        urban_trend = "significant urban decline"
-        urban_reason = "This indicates reduction in built-up areas, possibly due to demolition, land restoration, or natural disasters."
-    elif ndbi_change < 0:
-        urban_trend = "moderate urban decline"
-        urban_reason = "This suggests some reduction in built-up areas, possibly due to minor land use changes or seasonal variations."
-    else:
-        urban_trend = "stable urban conditions"
-        urban_reason = "Built-up areas have remained relatively stable during the analysis period."
-    
-    # Determine problems and solutions
-    if priority == "High":
-        problems = "High conservation priority indicates significant environmental concerns, including potential habitat loss, biodiversity decline, and ecosystem degradation."
-        solutions = "Immediate conservation measures recommended: establish protected areas, implement sustainable land use policies, promote reforestation, and monitor environmental impacts."
-    elif priority == "Medium":
-        problems = "Medium conservation priority suggests moderate environmental concerns that require attention to prevent further degradation."
-        solutions = "Recommended actions: implement sustainable development practices, establish monitoring programs, promote green infrastructure, and engage in community conservation efforts."
-    else:
-        problems = "Low conservation priority indicates relatively stable environmental conditions, but continued monitoring is important."
-        solutions = "Maintain current environmental conditions through sustainable practices, regular monitoring, and community awareness programs."
+    # Only these fields appear in the text; as a tuple they make a hashable cache key
+    return _template_summary(
+        summary_data.get('start_date', 'N/A'),
+        summary_data.get('end_date', 'N/A'),
+        summary_data.get('ndvi_change', 0),
+        summary_data.get('ndbi_change', 0),
+        summary_data.get('conservation_priority', 'Unknown')
+    )
+
+@functools.lru_cache(maxsize=128)
+def _template_summary(start_date, end_date, ndvi_change, ndbi_change, priority):
+    # Look up trends, reasons, problems and solutions
+    ndvi_idx, ndbi_idx = np.searchsorted(_CHANGE_BINS, [ndvi_change, ndbi_change], side='right')
+    veg_trend, veg_reason = _NDVI_PHRASES[ndvi_idx]
+    urban_trend, urban_reason = _NDBI_PHRASES[ndbi_idx]
+    problems, solutions = _PRIORITY_PHRASES.get(priority, _PRIORITY_PHRASES["Low"])
+    ndvi_direction = _DIRECTIONS[int(np.sign(ndvi_change)) + 1]
+    ndbi_direction = _DIRECTIONS[int(np.sign(ndbi_change)) + 1]
     
     summary = f"""
 ## Summary
-Analysis of the selected area from {summary_data.get('start_date', 'N/A')} to {summary_data.get('end_date', 'N/A')} reveals {veg_trend} and {urban_trend}. The conservation priority for this area is classified as **{priority}**.
+Analysis of the selected area from {start_date} to {end_date} reveals {veg_trend} and {urban_trend}. The conservation priority for this area is classified as **{priority}**.
 
 ## Key Findings
-- **Vegetation Change (NDVI):** {ndvi_change:.3f} ({'increase' if ndvi_change > 0 else 'decrease' if ndvi_change < 0 else 'no change'})
-- **Urban Development (NDBI):** {ndbi_change:.3f} ({'increase' if ndbi_change > 0 else 'decrease' if ndbi_change < 0 else 'no change'})
+- **Vegetation Change (NDVI):** {ndvi_change:.3f} ({ndvi_direction})
+- **Urban Development (NDBI):** {ndbi_change:.3f} ({ndbi_direction})
 - **Conservation Priority:** {priority}
 
 ## Reasons for Changes
@@ -339,7 +531,74 @@ Analysis of the selected area from {summary_data.get('start_date', 'N/A')} to {s
     
     return summary
 
+def parse_geometry(geometry):
+    # Snapped (bbox, polygon) for a drawn rectangle/polygon, or None if unsupported
+    if geometry["type"] not in ("Polygon", "Rectangle"):
+        return None
+    coords = geometry["coordinates"][0]
+    vertices = np.asarray(coords, dtype=np.float64)
+    (min_lon, min_lat), (max_lon, max_lat) = vertices.min(axis=0).tolist(), vertices.max(axis=0).tolist()
+    # Snap before anything is built from it, so tiny redraw jitter still hits the cache
+    bbox = snap_bbox(min_lat, max_lat, min_lon, max_lon)
+    polygon = snap_polygon(coords) if geometry["type"] == "Polygon" else None
+    return bbox, polygon
+
+def render_analysis(result):
+    bbox, _, start_date, end_date = result["inputs"]
+    tiles1, tiles2 = result["tiles"]
+    mean_ndvi1, mean_ndvi2, mean_ndbi1, mean_ndbi2 = result["means"]
+    summary_data = result["summary_data"]
+    ndvi_diff, ndbi_diff = summary_data["ndvi_change"], summary_data["ndbi_change"]
+    priority = summary_data["conservation_priority"]
+
+    st.markdown("### 🛰️ Satellite Images (Sentinel-2)")
+    col1, col2 = st.columns(2)
+    with col1:
+        card("date-card", f"<h4>📅 {start_date}</h4>")
+        st_folium.st_folium(preview_map(tiles1, *bbox), key="preview_start", height=350,
+                            returned_objects=[], use_container_width=True)
+        st.caption(f"Start Period: {start_date}")
+    with col2:
+        card("date-card", f"<h4>📅 {end_date}</h4>")
+        st_folium.st_folium(preview_map(tiles2, *bbox), key="preview_end", height=350,
+                            returned_objects=[], use_container_width=True)
+        st.caption(f"End Period: {end_date}")
+
+    st.markdown("### 📊 Analysis Results")
+    
+    # Create metric cards
+    col1, col2, col3 = st.columns(3)
+    metrics = [
+        ("🌱", "Vegetation (NDVI)", mean_ndvi1, mean_ndvi2, ndvi_diff),
+        ("🏗️", "Urban (NDBI)", mean_ndbi1, mean_ndbi2, ndbi_diff),
+    ]
+    for (emoji, label, start, end, change), col in zip(metrics, (col1, col2)):
+        with col:
+            card("metric-card", _METRIC_CARD.format(emoji=emoji, label=label, start=start, end=end, change=change))
+    
+    with col3:
+        priority_color = "success-card" if priority == "Low" else "warning-card" if priority == "Medium" else "info-card"
+        card(priority_color, f"<h4>🛡️ Conservation Priority</h4><h2>{priority}</h2>")
+
+    # --- AI Summary Section ---
+    st.markdown("### 🤖 AI-Powered Analysis Summary")
+    st.markdown(f"""
+    <div class="summary-section">
+        {result["summary_md"]}
+    </div>
+    """, unsafe_allow_html=True)
+
 # --- Analyze Button ---
+# Results of the last analysis are kept in session state. Any other widget
+# interaction re-runs the script, and as long as the dates and area are unchanged
+# the results are re-rendered from there instead of being recomputed.
+analysis_inputs = None
+if geometry:
+    parsed = parse_geometry(geometry)
+    if parsed is not None:
+        analysis_inputs = (*parsed, start_date, end_date)
+last_result = st.session_state.get("analysis_result")
+
 if st.button("Analyze", type="primary"):
     if not geometry:
         st.error("Please draw a rectangle or polygon on the map to select your area.")
@@ -353,60 +612,27 @@ if st.button("Analyze", type="primary"):
         if gee_authenticate():
             with st.spinner("Fetching satellite images and running analysis..."):
                 try:
-                    # Convert geometry to bounding box and ee.Geometry
-                    if geometry["type"] == "Polygon":
-                        coords = geometry["coordinates"][0]
-                        lats = [pt[1] for pt in coords]
-                        lons = [pt[0] for pt in coords]
-                        min_lat, max_lat = min(lats), max(lats)
-                        min_lon, max_lon = min(lons), max(lons)
-                        ee_geom = ee.Geometry.Polygon([coords])
-                    elif geometry["type"] == "Rectangle":
-                        coords = geometry["coordinates"][0]
-                        lats = [pt[1] for pt in coords]
-                        lons = [pt[0] for pt in coords]
-                        min_lat, max_lat = min(lats), max(lats)
-                        min_lon, max_lon = min(lons), max(lons)
-                        ee_geom = ee.Geometry.Rectangle([min_lon, min_lat, max_lon, max_lat])
-                    else:
+                    if analysis_inputs is None:
                         st.error("Unsupported geometry type. Please draw a rectangle or polygon.")
                         st.stop()
 
-                    # Fetch composites
-                    composite1 = get_s2_composite(min_lat, max_lat, min_lon, max_lon, start_date, start_date + timedelta(days=1))
-                    composite2 = get_s2_composite(min_lat, max_lat, min_lon, max_lon, end_date, end_date + timedelta(days=1))
-                    url1 = get_s2_url(composite1, min_lat, max_lat, min_lon, max_lon)
-                    url2 = get_s2_url(composite2, min_lat, max_lat, min_lon, max_lon)
-
-                    st.markdown("### 🛰️ Satellite Images (Sentinel-2)")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.markdown(f"""
-                        <div style="text-align: center; padding: 1rem; background: #f8f9fa; border-radius: 10px; margin: 1rem 0;">
-                            <h4>📅 {start_date}</h4>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        st.image(url1, caption=f"Start Period: {start_date}")
-                    with col2:
-                        st.markdown(f"""
-                        <div style="text-align: center; padding: 1rem; background: #f8f9fa; border-radius: 10px; margin: 1rem 0;">
-                            <h4>📅 {end_date}</h4>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        st.image(url2, caption=f"End Period: {end_date}")
-
-                    # --- NDVI Analysis ---
-                    ndvi1 = calculate_ndvi(composite1)
-                    ndvi2 = calculate_ndvi(composite2)
-                    mean_ndvi1 = get_mean_stat(ndvi1, 'NDVI', ee_geom).getInfo()
-                    mean_ndvi2 = get_mean_stat(ndvi2, 'NDVI', ee_geom).getInfo()
-                    ndvi_diff = mean_ndvi2 - mean_ndvi1 if mean_ndvi1 is not None and mean_ndvi2 is not None else None
+                    bbox, polygon = analysis_inputs[:2]
+                    period1 = (start_date, start_date + timedelta(days=1))
+                    period2 = (end_date, end_date + timedelta(days=1))
 
-                    # --- Built-up Area Analysis (NDBI) ---
-                    ndbi1 = calculate_builtup(composite1)
-                    ndbi2 = calculate_builtup(composite2)
-                    mean_ndbi1 = get_mean_stat(ndbi1, 'NDBI', ee_geom).getInfo()
-                    mean_ndbi2 = get_mean_stat(ndbi2, 'NDBI', ee_geom).getInfo()
+                    # Pick up a saved export that finished after this area was last cached
+                    get_saved_assets(analysis_key(*bbox, period1, period2, polygon))
+
+                    # Fetch index means and previews concurrently. Statistics go first so
+                    # that an empty date range reports as such rather than as a render error.
+                    means, tiles = run_parallel(
+                        (compute_indices, *bbox, period1, period2, polygon),
+                        (get_s2_preview_urls, *bbox, period1, period2, polygon)
+                    )
+                    mean_ndvi1, mean_ndvi2, mean_ndbi1, mean_ndbi2 = means
+
+                    # --- NDVI / NDBI Analysis ---
+                    ndvi_diff = mean_ndvi2 - mean_ndvi1 if mean_ndvi1 is not None and mean_ndvi2 is not None else None
                     ndbi_diff = mean_ndbi2 - mean_ndbi1 if mean_ndbi1 is not None and mean_ndbi2 is not None else None
 
                     # --- Conservation Priority ---
@@ -420,40 +646,6 @@ if st.button("Analyze", type="primary"):
                     else:
                         priority = "Unknown"
 
-                    st.markdown("### 📊 Analysis Results")
-                    
-                    # Create metric cards
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <h4>🌱 Vegetation (NDVI)</h4>
-                            <p><strong>Start:</strong> {mean_ndvi1:.3f}</p>
-                            <p><strong>End:</strong> {mean_ndvi2:.3f}</p>
-                            <p><strong>Change:</strong> {ndvi_diff:.3f}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        st.markdown(f"""
-                        <div class="metric-card">
-                            <h4>🏗️ Urban (NDBI)</h4>
-                            <p><strong>Start:</strong> {mean_ndbi1:.3f}</p>
-                            <p><strong>End:</strong> {mean_ndbi2:.3f}</p>
-                            <p><strong>Change:</strong> {ndbi_diff:.3f}</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col3:
-                        priority_color = "success-card" if priority == "Low" else "warning-card" if priority == "Medium" else "info-card"
-                        st.markdown(f"""
-                        <div class="{priority_color}">
-                            <h4>🛡️ Conservation Priority</h4>
-                            <h2>{priority}</h2>
-                        </div>
-                        """, unsafe_allow_html=True)
-
                     # Prepare summary for GPT-4.1
                     summary_data = {
                         "start_date": str(start_date),
@@ -467,34 +659,35 @@ if st.button("Analyze", type="primary"):
                         "conservation_priority": priority
                     }
                     st.session_state["summary_data"] = summary_data
-
-                    # --- AI Summary Section ---
-                    st.markdown("### 🤖 AI-Powered Analysis Summary")
-                    gpt_summary = generate_template_summary(summary_data)
-                    st.markdown(f"""
-                    <div class="summary-section">
-                        {gpt_summary}
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.session_state["analysis_result"] = {
+                        "inputs": analysis_inputs,
+                        "periods": (period1, period2),
+                        "tiles": tiles,
+                        "means": means,
+                        "summary_data": summary_data,
+                        "summary_md": generate_template_summary(summary_data)
+                    }
+                    render_analysis(st.session_state["analysis_result"])
 
                 except Exception as e:
-                    st.markdown(f"""
-                    <div class="warning-card">
-                        <h4>❌ Error</h4>
-                        <p>Error fetching images or running analysis: {e}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    card("warning-card", f"<h4>❌ Error</h4><p>Error fetching images or running analysis: {e}</p>")
         else:
-            st.markdown(f"""
-            <div class="warning-card">
-                <h4>🔐 Authentication Error</h4>
-                <p>Google Earth Engine authentication failed. Please check your credentials.</p>
-            </div>
-            """, unsafe_allow_html=True)
+            card("warning-card", "<h4>🔐 Authentication Error</h4>"
+                 "<p>Google Earth Engine authentication failed. Please check your credentials.</p>")
+elif last_result is not None and last_result["inputs"] == analysis_inputs:
+    render_analysis(last_result)
 else:
-    st.markdown(f"""
-    <div class="info-card">
-        <h4>ℹ️ Ready to Analyze</h4>
-        <p>Select area and timeframes, then click Analyze to begin your urban sprawl analysis.</p>
-    </div>
-    """, unsafe_allow_html=True) 
\ No newline at end of file
+    card("info-card", "<h4>ℹ️ Ready to Analyze</h4>"
+         "<p>Select area and timeframes, then click Analyze to begin your urban sprawl analysis.</p>")
+
+# --- Save Analysis ---
+# Only offered for the inputs currently selected, so an old result is never
+# saved under a different area or timeframe
+result = st.session_state.get("analysis_result")
+if result and result["inputs"] == analysis_inputs and st.button("💾 Save analysis"):
+    try:
+        bbox, polygon = result["inputs"][:2]
+        key = save_analysis(*bbox, *result["periods"], polygon, result["means"])
+        st.success(f"Export started. Re-running this analysis will load the saved composites ({key}) once the export completes.")
+    except Exception as e:
+        st.error(f"Could not save analysis: {e}")
@@ -0,0 +1,3 @@
+"""
+Configuration for Urban Sprawl Analysis
+"""
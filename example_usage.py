@@ -27,7 +27,7 @@ def example_basic_analysis():
         visualizer = UrbanSprawlVisualizer()
         
         # Get study area
-        study_area = gee_processor.create_study_area_roi()
+        study_area = gee_processor.study_area_roi
         print(f"Study area created: Kathmandu Valley")
         
         # Example: Get data availability
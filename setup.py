@@ -7,6 +7,8 @@ import os
 import sys
 import subprocess
 import platform
+from concurrent.futures import ThreadPoolExecutor
+from importlib.metadata import distribution, PackageNotFoundError
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -29,21 +31,23 @@ def install_dependencies():
         return False
 
 def check_gee_authentication():
-    """Check Google Earth Engine authentication"""
-    print("\n🌍 Checking Google Earth Engine authentication...")
+    """Check Google Earth Engine authentication, returning (authenticated, messages)"""
+    # Messages are returned rather than printed so main() can run this check in
+    # the background without interleaving its output with the other steps
     try:
         import ee
         ee.Initialize()
-        print("✅ Google Earth Engine is authenticated")
-        return True
+        return True, ["✅ Google Earth Engine is authenticated"]
     except ImportError:
-        print("❌ Google Earth Engine API not installed")
-        print("Please install: pip install earthengine-api")
-        return False
+        return False, [
+            "❌ Google Earth Engine API not installed",
+            "Please install: pip install earthengine-api"
+        ]
     except Exception as e:
-        print("❌ Google Earth Engine authentication required")
-        print("Please run: earthengine authenticate")
-        return False
+        return False, [
+            "❌ Google Earth Engine authentication required",
+            "Please run: earthengine authenticate"
+        ]
 
 def create_directories():
     """Create necessary directories"""
@@ -80,9 +84,10 @@ def check_dependencies():
     missing_packages = []
     for package in required_packages:
         try:
-            __import__(package.replace("-", "_"))
+            # Read installed metadata only; importing would load every package
+            distribution(package)
             print(f"✅ {package}")
-        except ImportError:
+        except PackageNotFoundError:
             print(f"❌ {package}")
             missing_packages.append(package)
     
@@ -100,21 +105,41 @@ def main():
     if not check_python_version():
         sys.exit(1)
     
-    # Install dependencies
-    if not install_dependencies():
-        sys.exit(1)
+    # Install dependencies (pip fails if any requirement can't be satisfied,
+    # so a successful install needs no separate package check). With
+    # --skip-install, only check the existing environment instead.
+    skip_install = '--skip-install' in sys.argv[1:]
     
-    # Check dependencies
-    if not check_dependencies():
-        print("\nPlease install missing packages manually:")
-        print("pip install -r requirements.txt")
-        sys.exit(1)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        gee_check = None
+        if skip_install:
+            # Nothing gets installed, so the network-bound GEE check (ee import plus
+            # auth handshake) can start now and overlap the local steps below
+            gee_check = executor.submit(check_gee_authentication)
+            packages_ok = check_dependencies()
+        else:
+            packages_ok = install_dependencies()
+        
+        if not packages_ok:
+            print("\nPlease install missing packages manually:")
+            print("pip install -r requirements.txt")
+            sys.exit(1)
+        
+        # Create directories
+        create_directories()
+        
+        # After an install, ee only becomes importable now
+        if gee_check is not None:
+            gee_authenticated, gee_messages = gee_check.result()
+        else:
+            gee_authenticated, gee_messages = check_gee_authentication()
     
-    # Create directories
-    create_directories()
+    # Check GEE authentication (printed here so output order is fixed)
+    print("\n🌍 Checking Google Earth Engine authentication...")
+    for message in gee_messages:
+        print(message)
     
-    # Check GEE authentication
-    if not check_gee_authentication():
+    if not gee_authenticated:
         print("\nTo authenticate with Google Earth Engine:")
         print("1. Sign up at https://earthengine.google.com")
         print("2. Run: earthengine authenticate")
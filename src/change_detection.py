@@ -3,15 +3,14 @@ Change Detection for Urban Sprawl Analysis
 """
 
 import ee
+import logging
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
-import sys
-import os
 
-# Add config to path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
-from settings import ANALYSIS_PARAMS, CHANGE_DETECTION
+from config.settings import ANALYSIS_PARAMS, CHANGE_DETECTION
+
+logger = logging.getLogger(__name__)
 
 class ChangeDetector:
     """Detect and analyze changes in land cover over time"""
@@ -64,26 +63,88 @@ class ChangeDetector:
         Returns:
             Dict: Vegetation change statistics
         """
-        # Calculate NDVI for both images
-        ndvi1 = self.gee_processor.calculate_ndvi(image1)
-        ndvi2 = self.gee_processor.calculate_ndvi(image2)
-        
         # Calculate NDVI difference
-        ndvi_change = ndvi2.subtract(ndvi1).rename('ndvi_change')
+        ndvi_change = self._index_change(image1, image2).select('NDVI').rename('ndvi_change')
+        
+        # Get statistics and loss/gain/no-change areas in one round-trip
+        result = self._change_summary_request(ndvi_change).getInfo()
+        return self._vegetation_changes(*self._parse_change_summary(result))
+    
+    def analyze_urban_expansion(self, image1: ee.Image, image2: ee.Image) -> Dict:
+        """
+        Analyze urban expansion patterns
+        
+        Args:
+            image1: ee.Image from earlier time period
+            image2: ee.Image from later time period
+            
+        Returns:
+            Dict: Urban expansion statistics
+        """
+        # Calculate built-up change
+        ndbi_change = self._index_change(image1, image2).select('NDBI').rename('ndbi_change')
         
-        # Get statistics
-        region = self.gee_processor.create_study_area_roi()
-        stats = self.gee_processor.get_image_statistics(ndvi_change, region)
+        # Get statistics and expansion/decline/stable areas in one round-trip
+        result = self._change_summary_request(ndbi_change).getInfo()
+        return self._urban_expansion(*self._parse_change_summary(result))
+    
+    def full_report(self, image1: ee.Image, image2: ee.Image,
+                    classified1: ee.Image = None, classified2: ee.Image = None) -> Dict:
+        """
+        Run vegetation, urban, elevation and (optionally) land cover change analysis together
+        
+        All reductions are sent in a single getInfo() instead of one or more
+        round-trips per analysis.
+        
+        Args:
+            image1: ee.Image from earlier time period
+            image2: ee.Image from later time period
+            classified1: ee.Image classified land cover (earlier time), for the change matrix
+            classified2: ee.Image classified land cover (later time), for the change matrix
+            
+        Returns:
+            Dict: 'vegetation_changes', 'urban_expansion' and 'elevation_analysis' results as returned
+            by the individual analyses, plus 'change_matrix' when classified images are given
+        """
+        index_change = self._index_change(image1, image2)
+        zone_names, elevation_request = self._elevation_request(index_change.select('NDVI'))
         
-        # Classify changes
-        vegetation_loss = ndvi_change.lt(-0.1)  # Significant decrease
-        vegetation_gain = ndvi_change.gt(0.1)   # Significant increase
-        no_change = ndvi_change.abs().lt(0.1)   # Minimal change
+        requests = {
+            'vegetation_changes': self._change_summary_request(index_change.select('NDVI').rename('ndvi_change')),
+            'urban_expansion': self._change_summary_request(index_change.select('NDBI').rename('ndbi_change')),
+            'elevation_analysis': elevation_request
+        }
+        if classified1 is not None and classified2 is not None:
+            requests['change_matrix'] = self._change_matrix_request(classified1, classified2)
+        
+        results = ee.Dictionary(requests).getInfo()
+        
+        report = {
+            'vegetation_changes': self._vegetation_changes(
+                *self._parse_change_summary(results['vegetation_changes'])
+            ),
+            'urban_expansion': self._urban_expansion(
+                *self._parse_change_summary(results['urban_expansion'])
+            ),
+            'elevation_analysis': self._parse_elevation_stats(zone_names, results['elevation_analysis'])
+        }
+        if 'change_matrix' in results:
+            report['change_matrix'] = self._parse_change_matrix(results['change_matrix'])
         
-        # Calculate areas
-        loss_area = self._calculate_area(vegetation_loss, region)
-        gain_area = self._calculate_area(vegetation_gain, region)
-        no_change_area = self._calculate_area(no_change, region)
+        return report
+    
+    def _vegetation_changes(self, stats: Dict, areas: Dict[str, float]) -> Dict:
+        """
+        Build vegetation change statistics from change statistics and class areas
+        
+        Args:
+            stats: NDVI change statistics
+            areas: Area in square kilometers per change class
+            
+        Returns:
+            Dict: Vegetation change statistics
+        """
+        loss_area, gain_area, no_change_area = areas['decrease'], areas['increase'], areas['no_change']
         
         return {
             'ndvi_change_stats': stats,
@@ -94,37 +155,18 @@ class ChangeDetector:
             'change_percentage': ((gain_area - loss_area) / (loss_area + gain_area + no_change_area)) * 100
         }
     
-    def analyze_urban_expansion(self, image1: ee.Image, image2: ee.Image) -> Dict:
+    def _urban_expansion(self, stats: Dict, areas: Dict[str, float]) -> Dict:
         """
-        Analyze urban expansion patterns
+        Build urban expansion statistics from change statistics and class areas
         
         Args:
-            image1: ee.Image from earlier time period
-            image2: ee.Image from later time period
+            stats: NDBI change statistics
+            areas: Area in square kilometers per change class
             
         Returns:
             Dict: Urban expansion statistics
         """
-        # Calculate built-up index for both images
-        ndbi1 = self.gee_processor.calculate_built_up_index(image1)
-        ndbi2 = self.gee_processor.calculate_built_up_index(image2)
-        
-        # Calculate built-up change
-        ndbi_change = ndbi2.subtract(ndbi1).rename('ndbi_change')
-        
-        # Get statistics
-        region = self.gee_processor.create_study_area_roi()
-        stats = self.gee_processor.get_image_statistics(ndbi_change, region)
-        
-        # Classify urban expansion
-        urban_expansion = ndbi_change.gt(0.1)  # Significant increase in built-up
-        urban_decline = ndbi_change.lt(-0.1)   # Significant decrease in built-up
-        stable_urban = ndbi_change.abs().lt(0.1)  # Minimal change
-        
-        # Calculate areas
-        expansion_area = self._calculate_area(urban_expansion, region)
-        decline_area = self._calculate_area(urban_decline, region)
-        stable_area = self._calculate_area(stable_urban, region)
+        expansion_area, decline_area, stable_area = areas['increase'], areas['decrease'], areas['no_change']
         
         return {
             'ndbi_change_stats': stats,
@@ -135,27 +177,74 @@ class ChangeDetector:
             'expansion_rate_percent': (expansion_area / (expansion_area + decline_area + stable_area)) * 100
         }
     
-    def _calculate_area(self, mask: ee.Image, region: ee.Geometry) -> float:
+    def _index_change(self, image1: ee.Image, image2: ee.Image) -> ee.Image:
         """
-        Calculate area of masked pixels
+        Calculate the NDVI and NDBI difference between two images
         
         Args:
-            mask: ee.Image boolean mask
-            region: Analysis region
+            image1: ee.Image from earlier time period
+            image2: ee.Image from later time period
             
         Returns:
-            float: Area in square kilometers
+            ee.Image: 'NDVI' and 'NDBI' change bands
         """
-        area = mask.multiply(ee.Image.pixelArea()).reduceRegion(
-            reducer=ee.Reducer.sum(),
+        return self.gee_processor.compute_indices(image2).subtract(
+            self.gee_processor.compute_indices(image1)
+        )
+    
+    def _change_summary_request(self, change: ee.Image) -> ee.Dictionary:
+        """
+        Build change statistics and an area-weighted histogram of a change band
+        
+        Areas come from one histogram of the change band rather than a
+        separate mask and reduction per class.
+        
+        Args:
+            change: ee.Image single-band index difference
+            
+        Returns:
+            ee.Dictionary: Server-side 'stats' and 'histogram', see _parse_change_summary
+        """
+        region = self.gee_processor.study_area_roi
+        
+        # Index differences span [-2, 2]; 0.1-wide bins put bin edges on +/-0.1
+        histogram = change.addBands(self.gee_processor.pixel_area).reduceRegion(
+            reducer=ee.Reducer.fixedHistogram(-2, 2, 40).splitWeights(),
             geometry=region,
             scale=ANALYSIS_PARAMS['scale'],
             maxPixels=1e13
         )
         
-        # Convert to square kilometers
-        area_km2 = area.getInfo().get('land_cover', 0) / 1e6
-        return area_km2
+        return ee.Dictionary({
+            'stats': self.gee_processor.reduce_image_statistics(change, region),
+            'histogram': histogram
+        })
+    
+    def _parse_change_summary(self, result: Dict,
+                              threshold: float = 0.1) -> Tuple[Dict, Dict[str, float]]:
+        """
+        Split a fetched change summary into statistics and class areas
+        
+        Args:
+            result: Fetched result of _change_summary_request
+            threshold: Minimum absolute change counted as significant
+            
+        Returns:
+            Tuple[Dict, Dict[str, float]]: Change statistics and area in square kilometers
+            for 'decrease', 'no_change' and 'increase'
+        """
+        # Each row is [bin lower edge, area in m²]
+        areas = dict.fromkeys(['decrease', 'no_change', 'increase'], 0.0)
+        for bin_min, area in next(iter(result['histogram'].values()), None) or []:
+            bin_min = round(bin_min, 6)
+            if bin_min < -threshold:
+                areas['decrease'] += area / 1e6
+            elif bin_min >= threshold:
+                areas['increase'] += area / 1e6
+            else:
+                areas['no_change'] += area / 1e6
+        
+        return result['stats'], areas
     
     def create_change_matrix(self, image1: ee.Image, image2: ee.Image) -> pd.DataFrame:
         """
@@ -168,26 +257,62 @@ class ChangeDetector:
         Returns:
             pd.DataFrame: Change matrix
         """
+        return self._parse_change_matrix(self._change_matrix_request(image1, image2).getInfo())
+    
+    def _change_matrix_request(self, image1: ee.Image, image2: ee.Image) -> ee.Dictionary:
+        """
+        Build the land cover transition areas without fetching them
+        
+        Args:
+            image1: ee.Image classified land cover (earlier time)
+            image2: ee.Image classified land cover (later time)
+            
+        Returns:
+            ee.Dictionary: Server-side pixel area grouped by 'from' and 'to' class
+        """
         # Get land cover bands
         lc1 = image1.select('land_cover')
         lc2 = image2.select('land_cover')
         
-        # Create region for analysis
-        region = self.gee_processor.create_study_area_roi()
+        # Sum pixel area grouped by (from, to) class pair in a single reduction.
+        # Grouped reducers expect the summed band first and the group fields after it.
+        pairs = self.gee_processor.pixel_area.rename('area').addBands(
+            lc2.rename('to')
+        ).addBands(
+            lc1.rename('from')
+        )
+        
+        return pairs.reduceRegion(
+            reducer=ee.Reducer.sum().group(1, 'to').group(2, 'from'),
+            geometry=self.gee_processor.study_area_roi,
+            scale=ANALYSIS_PARAMS['scale'],
+            maxPixels=1e13
+        )
+    
+    def _parse_change_matrix(self, result: Dict) -> pd.DataFrame:
+        """
+        Turn fetched land cover transition areas into a change matrix
         
+        Args:
+            result: Fetched result of _change_matrix_request
+            
+        Returns:
+            pd.DataFrame: Change matrix
+        """
         # Get class names
         class_names = ['vegetation', 'built_up', 'water', 'bare_soil']
         
         # Create change matrix
-        change_matrix = {}
+        change_matrix = {class1: dict.fromkeys(class_names, 0.0) for class1 in class_names}
         
-        for i, class1 in enumerate(class_names, 1):
-            change_matrix[class1] = {}
-            for j, class2 in enumerate(class_names, 1):
-                # Count pixels that changed from class1 to class2
-                mask = lc1.eq(i).And(lc2.eq(j))
-                area = self._calculate_area(mask, region)
-                change_matrix[class1][class2] = area
+        for from_group in result.get('groups', []):
+            i = int(from_group['from'])
+            if not 1 <= i <= len(class_names):
+                continue
+            for to_group in from_group['groups']:
+                j = int(to_group['to'])
+                if 1 <= j <= len(class_names):
+                    change_matrix[class_names[i - 1]][class_names[j - 1]] = to_group['sum'] / 1e6
         
         return pd.DataFrame(change_matrix, index=class_names)
     
@@ -202,67 +327,99 @@ class ChangeDetector:
         Returns:
             Dict: Elevation-based change analysis
         """
-        # Get elevation data
-        elevation = self.gee_processor.get_elevation_data()
-        slope, aspect = self.gee_processor.calculate_slope_aspect(elevation)
-        
         # Calculate vegetation changes
-        ndvi1 = self.gee_processor.calculate_ndvi(image1)
-        ndvi2 = self.gee_processor.calculate_ndvi(image2)
-        ndvi_change = ndvi2.subtract(ndvi1)
-        
-        # Analyze changes by elevation zones
-        elevation_zones = self._create_elevation_zones(elevation)
-        
-        elevation_analysis = {}
-        for zone_name, zone_mask in elevation_zones.items():
-            # Calculate change statistics for each elevation zone
-            zone_stats = ndvi_change.updateMask(zone_mask).reduceRegion(
-                reducer=ee.Reducer.mean().combine(ee.Reducer.stdDev(), '', True),
-                geometry=self.gee_processor.create_study_area_roi(),
-                scale=ANALYSIS_PARAMS['scale'],
-                maxPixels=1e13
-            )
-            
-            elevation_analysis[zone_name] = zone_stats.getInfo()
+        ndvi_change = self._index_change(image1, image2).select('NDVI')
         
-        return elevation_analysis
+        zone_names, request = self._elevation_request(ndvi_change)
+        return self._parse_elevation_stats(zone_names, request.getInfo())
     
-    def _create_elevation_zones(self, elevation: ee.Image) -> Dict[str, ee.Image]:
+    def _elevation_request(self, ndvi_change: ee.Image) -> Tuple[List[str], ee.Dictionary]:
         """
-        Create elevation zones for analysis
+        Build NDVI change statistics per elevation zone without fetching them
         
         Args:
-            elevation: ee.Image elevation data
+            ndvi_change: ee.Image NDVI difference
             
         Returns:
-            Dict[str, ee.Image]: Elevation zone masks
+            Tuple[List[str], ee.Dictionary]: Zone names and server-side statistics grouped by zone
         """
-        # Get elevation statistics
-        region = self.gee_processor.create_study_area_roi()
-        stats = elevation.reduceRegion(
-            reducer=ee.Reducer.minMax(),
+        # Get elevation data
+        elevation = self.gee_processor.get_elevation_data()
+        
+        # Elevation range is cached on the processor after the first analysis
+        region = self.gee_processor.study_area_roi
+        min_elev, max_elev = self.gee_processor.get_elevation_range(elevation, region)
+        zone_band = self._elevation_zone_band(elevation, min_elev, max_elev)
+        zone_names = self._elevation_zone_names(min_elev, max_elev)
+        
+        # Calculate change statistics for all elevation zones in one grouped reduction
+        zone_stats = ndvi_change.addBands(zone_band).reduceRegion(
+            reducer=ee.Reducer.mean().combine(ee.Reducer.stdDev(), '', True).group(1, 'zone'),
             geometry=region,
             scale=ANALYSIS_PARAMS['scale'],
             maxPixels=1e13
-        ).getInfo()
+        )
+        
+        return zone_names, zone_stats
+    
+    def _parse_elevation_stats(self, zone_names: List[str], result: Dict) -> Dict:
+        """
+        Map fetched per-zone statistics back to named elevation zones
+        
+        Args:
+            zone_names: Zone names, lowest zone first
+            result: Fetched result of _elevation_request
+            
+        Returns:
+            Dict: Elevation-based change analysis
+        """
+        # Keep the per-band keys of an ungrouped reduceRegion, e.g. 'NDVI_mean'
+        band = 'NDVI'
+        elevation_analysis = {
+            zone_name: {f'{band}_mean': None, f'{band}_stdDev': None}
+            for zone_name in zone_names
+        }
+        for group in result.get('groups', []):
+            elevation_analysis[zone_names[int(group['zone'])]] = {
+                f'{band}_mean': group.get('mean'),
+                f'{band}_stdDev': group.get('stdDev')
+            }
         
-        min_elev = stats.get('elevation_min', 0)
-        max_elev = stats.get('elevation_max', 1000)
+        return elevation_analysis
+    
+    def _elevation_zone_names(self, min_elev: float, max_elev: float) -> List[str]:
+        """
+        Name the four equal-height elevation zones between min_elev and max_elev
         
-        # Create elevation zones
+        Args:
+            min_elev: Minimum elevation in meters
+            max_elev: Maximum elevation in meters
+            
+        Returns:
+            List[str]: Zone names, lowest zone first
+        """
         zone_size = (max_elev - min_elev) / 4
         
-        zones = {}
-        for i in range(4):
-            zone_min = min_elev + i * zone_size
-            zone_max = min_elev + (i + 1) * zone_size
-            zone_name = f"elevation_{int(zone_min)}-{int(zone_max)}m"
+        return [
+            f"elevation_{int(min_elev + i * zone_size)}-{int(min_elev + (i + 1) * zone_size)}m"
+            for i in range(4)
+        ]
+    
+    def _elevation_zone_band(self, elevation: ee.Image, min_elev: float, max_elev: float) -> ee.Image:
+        """
+        Encode the four elevation zones as a single integer band
+        
+        Args:
+            elevation: ee.Image elevation data
+            min_elev: Minimum elevation in meters
+            max_elev: Maximum elevation in meters
             
-            zone_mask = elevation.gte(zone_min).And(elevation.lt(zone_max))
-            zones[zone_name] = zone_mask
+        Returns:
+            ee.Image: 'zone' band with values 0-3, lowest zone first
+        """
+        zone_size = (max_elev - min_elev) / 4
         
-        return zones
+        return elevation.subtract(min_elev).divide(zone_size).floor().clamp(0, 3).int().rename('zone')
     
     def generate_change_report(self, change_stats: Dict, 
                              study_area_name: str, 
@@ -320,7 +477,7 @@ KEY FINDINGS:
         return report
     
     def export_change_results(self, change_image: ee.Image, 
-                            filename: str) -> str:
+                            filename: str) -> Optional[str]:
         """
         Export change detection results
         
@@ -329,8 +486,21 @@ KEY FINDINGS:
             filename: Output filename
             
         Returns:
-            str: Export task ID
+            Optional[str]: Export task ID, or None if no change was detected
         """
+        # Coarse best-effort pixel count: cheap, and enough to tell an empty result apart
+        counts = change_image.reduceRegion(
+            reducer=ee.Reducer.count(),
+            geometry=self.gee_processor.study_area_roi,
+            scale=1000,
+            bestEffort=True,
+            maxPixels=1e6
+        ).getInfo()
+        
+        if not any(counts.values()):
+            logger.info("No change detected, skipping export of %s", filename)
+            return None
+        
         return self.gee_processor.export_image_to_drive(
             change_image, 
             filename
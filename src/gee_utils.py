@@ -3,30 +3,42 @@ Google Earth Engine Utilities for Urban Sprawl Analysis
 """
 
 import ee
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-import sys
-import os
+from typing import Dict, List, Tuple, Optional, Union
 
-# Add config to path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
-from settings import STUDY_AREA, TIME_PERIODS, LANDSAT_COLLECTION, ANALYSIS_PARAMS
+from config.settings import STUDY_AREA, TIME_PERIODS, LANDSAT_COLLECTION, ANALYSIS_PARAMS, ELEVATION
+
+logger = logging.getLogger(__name__)
 
 class GEEProcessor:
     """Google Earth Engine data processor for urban sprawl analysis"""
     
     def __init__(self):
         """Initialize GEE processor"""
+        self._ensure_initialized()
+        self._elevation_range_cache = {}
+    
+    @staticmethod
+    def _ensure_initialized():
+        """Initialize Earth Engine unless this process already has"""
+        # Re-initializing repeats the auth handshake and can fail with service-account credentials
+        if ee.data.is_initialized():
+            return
+        
         try:
             ee.Initialize()
-            print("Google Earth Engine initialized successfully")
+            logger.info("Google Earth Engine initialized successfully")
         except Exception as e:
-            print(f"Error initializing GEE: {e}")
-            print("Please run 'earthengine authenticate' first")
+            logger.error("Error initializing GEE: %s", e)
+            logger.error("Please run 'earthengine authenticate' first")
     
-    def create_study_area_roi(self) -> ee.Geometry:
-        """Create region of interest for study area"""
+    @functools.cached_property
+    def study_area_roi(self) -> ee.Geometry:
+        """Region of interest for study area, built once per processor"""
         coords = STUDY_AREA['coordinates']
         roi = ee.Geometry.Rectangle([
             coords['west'], coords['south'], 
@@ -34,14 +46,23 @@ class GEEProcessor:
         ])
         return roi
     
-    def get_landsat_collection(self, start_date: str, end_date: str, 
+    @functools.cached_property
+    def pixel_area(self) -> ee.Image:
+        """Pixel area image shared by every area calculation, so requests reuse a single node"""
+        return ee.Image.pixelArea()
+    
+    def create_study_area_roi(self) -> ee.Geometry:
+        """Create region of interest for study area"""
+        return self.study_area_roi
+    
+    def get_landsat_collection(self, start_date: Union[str, ee.Date], end_date: Union[str, ee.Date], 
                               cloud_threshold: int = None) -> ee.ImageCollection:
         """
         Get Landsat collection for specified time period
         
         Args:
-            start_date: Start date in YYYY-MM-DD format
-            end_date: End date in YYYY-MM-DD format
+            start_date: Start date in YYYY-MM-DD format or ee.Date
+            end_date: End date in YYYY-MM-DD format or ee.Date
             cloud_threshold: Maximum cloud cover percentage
             
         Returns:
@@ -54,7 +75,7 @@ class GEEProcessor:
         collection = ee.ImageCollection(LANDSAT_COLLECTION)
         
         # Filter by date and region
-        roi = self.create_study_area_roi()
+        roi = self.study_area_roi
         filtered = collection.filterBounds(roi)\
                             .filterDate(start_date, end_date)\
                             .filter(ee.Filter.lt('CLOUD_COVER', cloud_threshold))
@@ -62,17 +83,23 @@ class GEEProcessor:
         return filtered
     
     def get_composite_image(self, collection: ee.ImageCollection, 
-                           method: str = 'median') -> ee.Image:
+                           method: str = 'median',
+                           mask_clouds: bool = False) -> ee.Image:
         """
         Create composite image from collection
         
         Args:
             collection: ee.ImageCollection
             method: Compositing method ('median', 'mean', 'mosaic')
+            mask_clouds: Cloud-mask each image before compositing
             
         Returns:
             ee.Image: Composite image
         """
+        # QA bits are meaningless once composited, so masking has to happen per image
+        if mask_clouds:
+            collection = collection.map(self.apply_cloud_mask)
+        
         if method == 'median':
             return collection.median()
         elif method == 'mean':
@@ -104,6 +131,30 @@ class GEEProcessor:
         
         return image.updateMask(mask)
     
+    def compute_indices(self, image: ee.Image) -> ee.Image:
+        """
+        Calculate NDVI and NDBI together as one two-band image
+        
+        Both indices share a single band selection, so analyses that need
+        both send one subgraph per image instead of two.
+        
+        Args:
+            image: ee.Image with NIR, Red and SWIR bands
+            
+        Returns:
+            ee.Image: Image with 'NDVI' and 'NDBI' bands
+        """
+        bands = {
+            'NIR': image.select('SR_B5'),   # NIR band
+            'RED': image.select('SR_B4'),   # Red band
+            'SWIR': image.select('SR_B6')   # SWIR1 band
+        }
+        
+        indices = image.expression('(NIR - RED) / (NIR + RED)', bands).rename('NDVI').addBands(
+            image.expression('(SWIR - NIR) / (SWIR + NIR)', bands).rename('NDBI')
+        )
+        return indices
+    
     def calculate_ndvi(self, image: ee.Image) -> ee.Image:
         """
         Calculate Normalized Difference Vegetation Index
@@ -114,11 +165,7 @@ class GEEProcessor:
         Returns:
             ee.Image: NDVI image
         """
-        nir = image.select('SR_B5')  # NIR band
-        red = image.select('SR_B4')  # Red band
-        
-        ndvi = nir.subtract(red).divide(nir.add(red)).rename('NDVI')
-        return ndvi
+        return self.compute_indices(image).select('NDVI')
     
     def calculate_built_up_index(self, image: ee.Image) -> ee.Image:
         """
@@ -130,11 +177,7 @@ class GEEProcessor:
         Returns:
             ee.Image: Built-up index image
         """
-        swir = image.select('SR_B6')  # SWIR1 band
-        nir = image.select('SR_B5')   # NIR band
-        
-        ndbi = swir.subtract(nir).divide(swir.add(nir)).rename('NDBI')
-        return ndbi
+        return self.compute_indices(image).select('NDBI')
     
     def get_elevation_data(self) -> ee.Image:
         """
@@ -143,12 +186,41 @@ class GEEProcessor:
         Returns:
             ee.Image: Elevation image
         """
-        from config.settings import ELEVATION
-        
-        roi = self.create_study_area_roi()
+        roi = self.study_area_roi
         elevation = ee.Image(ELEVATION['dataset']).clip(roi)
         return elevation
     
+    def get_elevation_range(self, elevation: ee.Image, region: ee.Geometry = None) -> Tuple[float, float]:
+        """
+        Get minimum and maximum elevation, fetched once per image and region
+        
+        Args:
+            elevation: ee.Image elevation data
+            region: Region for statistics
+            
+        Returns:
+            Tuple[float, float]: Minimum and maximum elevation in meters
+        """
+        if region is None:
+            region = self.study_area_roi
+        
+        # get_elevation_data() builds a new ee.Image per call, so key on the expression itself
+        key = (elevation.serialize(), region.serialize())
+        if key not in self._elevation_range_cache:
+            stats = elevation.reduceRegion(
+                reducer=ee.Reducer.minMax(),
+                geometry=region,
+                scale=ANALYSIS_PARAMS['scale'],
+                maxPixels=1e13
+            ).getInfo()
+            
+            self._elevation_range_cache[key] = (
+                stats.get('elevation_min', 0),
+                stats.get('elevation_max', 1000)
+            )
+        
+        return self._elevation_range_cache[key]
+    
     def calculate_slope_aspect(self, elevation: ee.Image) -> Tuple[ee.Image, ee.Image]:
         """
         Calculate slope and aspect from elevation data
@@ -183,7 +255,7 @@ class GEEProcessor:
         if scale is None:
             scale = ANALYSIS_PARAMS['scale']
         if region is None:
-            region = self.create_study_area_roi()
+            region = self.study_area_roi
         
         task = ee.batch.Export.image.toDrive(
             image=image,
@@ -197,6 +269,29 @@ class GEEProcessor:
         task.start()
         return task.id
     
+    def batch_export_to_drive(self, images: Dict[str, ee.Image], scale: int = None,
+                              region: ee.Geometry = None, max_workers: int = 8) -> Dict[str, str]:
+        """
+        Export several images to Google Drive, starting the tasks concurrently
+        
+        Args:
+            images: Mapping of output filename to ee.Image
+            scale: Export scale in meters
+            region: Export region
+            max_workers: Maximum number of tasks started at once
+            
+        Returns:
+            Dict[str, str]: Export task ID per filename
+        """
+        # Each task.start() is a blocking HTTP call, so overlap them
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                filename: executor.submit(self.export_image_to_drive, image, filename, scale, region)
+                for filename, image in images.items()
+            }
+        
+        return {filename: future.result() for filename, future in futures.items()}
+    
     def get_image_statistics(self, image: ee.Image, region: ee.Geometry = None) -> Dict:
         """
         Get basic statistics for an image
@@ -208,10 +303,26 @@ class GEEProcessor:
         Returns:
             Dict: Statistics dictionary
         """
+        return self.reduce_image_statistics(image, region).getInfo()
+    
+    def reduce_image_statistics(self, image: ee.Image, region: ee.Geometry = None) -> ee.Dictionary:
+        """
+        Build basic statistics for an image without fetching them
+        
+        Lets callers batch the statistics with other server-side results
+        into a single getInfo() round-trip.
+        
+        Args:
+            image: ee.Image to analyze
+            region: Region for statistics
+            
+        Returns:
+            ee.Dictionary: Server-side statistics dictionary
+        """
         if region is None:
-            region = self.create_study_area_roi()
+            region = self.study_area_roi
         
-        stats = image.reduceRegion(
+        return image.reduceRegion(
             reducer=ee.Reducer.mean().combine(
                 ee.Reducer.stdDev(), '', True
             ).combine(
@@ -221,8 +332,6 @@ class GEEProcessor:
             scale=ANALYSIS_PARAMS['scale'],
             maxPixels=1e13
         )
-        
-        return stats.getInfo()
     
     def create_time_series(self, start_year: int, end_year: int, 
                           months: List[int] = None) -> Dict[int, ee.Image]:
@@ -242,24 +351,36 @@ class GEEProcessor:
         
         time_series = {}
         
-        for year in range(start_year, end_year + 1):
+        # Create date range for each year
+        collections = {
+            year: self.get_landsat_collection(ee.Date.fromYMD(year, months[0], 1),
+                                              ee.Date.fromYMD(year, months[-1], 28))
+            for year in range(start_year, end_year + 1)
+        }
+        
+        # Check every year's image count in a single round-trip. If that fails,
+        # fall back to per-year counts so one bad year is logged and skipped
+        # rather than aborting the whole series.
+        try:
+            counts = dict(zip(collections, ee.List([
+                collection.size() for collection in collections.values()
+            ]).getInfo()))
+        except Exception as e:
+            logger.warning("Batched image count failed, checking years individually: %s", e)
+            counts = None
+        
+        for year, collection in collections.items():
             try:
-                # Create date range for the year
-                start_date = f"{year}-{months[0]:02d}-01"
-                end_date = f"{year}-{months[-1]:02d}-28"
-                
-                # Get collection and create composite
-                collection = self.get_landsat_collection(start_date, end_date)
-                if collection.size().getInfo() > 0:
-                    composite = self.get_composite_image(collection)
-                    composite = self.apply_cloud_mask(composite)
+                count = counts[year] if counts is not None else collection.size().getInfo()
+                if count > 0:
+                    composite = self.get_composite_image(collection, mask_clouds=True)
                     time_series[year] = composite
-                    print(f"Created composite for {year}")
+                    logger.debug("Created composite for %d", year)
                 else:
-                    print(f"No data available for {year}")
+                    logger.warning("No data available for %d", year)
                     
             except Exception as e:
-                print(f"Error processing {year}: {e}")
+                logger.error("Error processing %d: %s", year, e)
         
         return time_series
     
@@ -275,14 +396,18 @@ class GEEProcessor:
             Dict: Data availability information
         """
         availability = {}
+        years = range(start_year, end_year + 1)
         
-        for year in range(start_year, end_year + 1):
+        # Collection sizes are lazy, so all years come back in a single getInfo()
+        counts = ee.List([
+            self.get_landsat_collection(f"{year}-01-01", f"{year}-12-31").size()
+            for year in years
+        ]).getInfo()
+        
+        for year, count in zip(years, counts):
             start_date = f"{year}-01-01"
             end_date = f"{year}-12-31"
             
-            collection = self.get_landsat_collection(start_date, end_date)
-            count = collection.size().getInfo()
-            
             availability[year] = {
                 'image_count': count,
                 'available': count > 0,
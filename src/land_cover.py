@@ -6,12 +6,115 @@ import ee
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
-import sys
-import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Add config to path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
-from settings import ANALYSIS_PARAMS, CLASSIFICATION
+from config.settings import ANALYSIS_PARAMS, CLASSIFICATION
+
+# Numba is optional; without it classify_bands falls back to NumPy
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# MNDWI above which a pixel is treated as water
+WATER_MNDWI_THRESHOLD = 0.2
+
+def classify_arrays(ndvi: np.ndarray, ndbi: np.ndarray, mndwi: np.ndarray,
+                    ndvi_threshold: float = None, built_up_threshold: float = None,
+                    water_threshold: float = WATER_MNDWI_THRESHOLD) -> np.ndarray:
+    """
+    Classify land cover from locally exported index rasters
+    
+    Fast path for raster pipelines that bypass Earth Engine; applies the same
+    rules and precedence as LandCoverClassifier.classify_land_cover.
+    
+    Args:
+        ndvi: NDVI array
+        ndbi: NDBI array
+        mndwi: MNDWI array
+        ndvi_threshold: Vegetation threshold (defaults to ANALYSIS_PARAMS)
+        built_up_threshold: Built-up threshold (defaults to ANALYSIS_PARAMS)
+        water_threshold: Water MNDWI threshold
+        
+    Returns:
+        np.ndarray: uint8 class IDs
+    """
+    if ndvi_threshold is None:
+        ndvi_threshold = ANALYSIS_PARAMS['ndvi_threshold']
+    if built_up_threshold is None:
+        built_up_threshold = ANALYSIS_PARAMS['built_up_threshold']
+    
+    classes = CLASSIFICATION['classes']
+    
+    # First matching condition wins: water > built-up > vegetation > bare soil
+    return np.select(
+        [mndwi > water_threshold, ndbi > built_up_threshold, ndvi > ndvi_threshold],
+        [classes['water'], classes['built_up'], classes['vegetation']],
+        default=classes['bare_soil']
+    ).astype(np.uint8)
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _classify_kernel(green, red, nir, swir, out, ndvi_threshold, built_up_threshold,
+                         water_threshold, vegetation_id, built_up_id, water_id, bare_soil_id):
+        # One pass per pixel: all three indices stay in registers, no temporaries
+        height, width = green.shape
+        for i in prange(height):
+            for j in range(width):
+                g = float(green[i, j])
+                r = float(red[i, j])
+                n = float(nir[i, j])
+                sw = float(swir[i, j])
+                if (g - sw) / (g + sw + 1e-9) > water_threshold:
+                    out[i, j] = water_id
+                elif (sw - n) / (sw + n + 1e-9) > built_up_threshold:
+                    out[i, j] = built_up_id
+                elif (n - r) / (n + r + 1e-9) > ndvi_threshold:
+                    out[i, j] = vegetation_id
+                else:
+                    out[i, j] = bare_soil_id
+
+def classify_bands(green: np.ndarray, red: np.ndarray, nir: np.ndarray, swir: np.ndarray,
+                   ndvi_threshold: float = None, built_up_threshold: float = None,
+                   water_threshold: float = WATER_MNDWI_THRESHOLD) -> np.ndarray:
+    """
+    Classify land cover straight from locally exported 2-D band rasters
+    
+    Uses a fused, parallel Numba kernel when Numba is installed, otherwise
+    computes the indices with NumPy and calls classify_arrays.
+    
+    Args:
+        green: Green band (SR_B3)
+        red: Red band (SR_B4)
+        nir: NIR band (SR_B5)
+        swir: SWIR1 band (SR_B6)
+        ndvi_threshold: Vegetation threshold (defaults to ANALYSIS_PARAMS)
+        built_up_threshold: Built-up threshold (defaults to ANALYSIS_PARAMS)
+        water_threshold: Water MNDWI threshold
+        
+    Returns:
+        np.ndarray: uint8 class IDs
+    """
+    if ndvi_threshold is None:
+        ndvi_threshold = ANALYSIS_PARAMS['ndvi_threshold']
+    if built_up_threshold is None:
+        built_up_threshold = ANALYSIS_PARAMS['built_up_threshold']
+    
+    if njit is not None:
+        classes = CLASSIFICATION['classes']
+        out = np.empty(green.shape, dtype=np.uint8)
+        _classify_kernel(green, red, nir, swir, out, ndvi_threshold, built_up_threshold,
+                         water_threshold, classes['vegetation'], classes['built_up'],
+                         classes['water'], classes['bare_soil'])
+        return out
+    
+    green, red, nir, swir = (band.astype(np.float32) for band in (green, red, nir, swir))
+    return classify_arrays(
+        (nir - red) / (nir + red + 1e-9),
+        (swir - nir) / (swir + nir + 1e-9),
+        (green - swir) / (green + swir + 1e-9),
+        ndvi_threshold, built_up_threshold, water_threshold
+    )
 
 class LandCoverClassifier:
     """Land cover classification using spectral indices"""
@@ -26,6 +129,7 @@ class LandCoverClassifier:
         self.gee_processor = gee_processor
         self.ndvi_threshold = ANALYSIS_PARAMS['ndvi_threshold']
         self.built_up_threshold = ANALYSIS_PARAMS['built_up_threshold']
+        self._id_to_name = {v: k for k, v in CLASSIFICATION['classes'].items()}
     
     def classify_land_cover(self, image: ee.Image) -> ee.Image:
         """
@@ -37,48 +141,27 @@ class LandCoverClassifier:
         Returns:
             ee.Image: Classified land cover image
         """
-        # Calculate indices
-        ndvi = self.gee_processor.calculate_ndvi(image)
-        ndbi = self.gee_processor.calculate_built_up_index(image)
-        
-        # Create classification masks
-        vegetation_mask = ndvi.gt(self.ndvi_threshold)
-        built_up_mask = ndbi.gt(self.built_up_threshold)
-        water_mask = self._detect_water(image)
-        
-        # Create classified image
-        classified = ee.Image(0).rename('land_cover')  # Initialize with 0 (unclassified)
-        
-        # Apply classification
-        classified = classified.where(vegetation_mask, CLASSIFICATION['classes']['vegetation'])
-        classified = classified.where(built_up_mask, CLASSIFICATION['classes']['built_up'])
-        classified = classified.where(water_mask, CLASSIFICATION['classes']['water'])
-        
-        # Remaining pixels are bare soil
-        classified = classified.where(classified.eq(0), CLASSIFICATION['classes']['bare_soil'])
+        # Single expression: each band is read once and only the class band is produced.
+        # Earlier conditions win, so water > built-up > vegetation > bare soil.
+        classified = image.expression(
+            '((GREEN - SWIR) / (GREEN + SWIR) > water_threshold) ? water'
+            ' : ((SWIR - NIR) / (SWIR + NIR) > built_up_threshold) ? built_up'
+            ' : ((NIR - RED) / (NIR + RED) > ndvi_threshold) ? vegetation'
+            ' : bare_soil',
+            {
+                'GREEN': image.select('SR_B3'),  # Green band
+                'RED': image.select('SR_B4'),    # Red band
+                'NIR': image.select('SR_B5'),    # NIR band
+                'SWIR': image.select('SR_B6'),   # SWIR1 band
+                'water_threshold': WATER_MNDWI_THRESHOLD,
+                'built_up_threshold': self.built_up_threshold,
+                'ndvi_threshold': self.ndvi_threshold,
+                **CLASSIFICATION['classes']
+            }
+        ).rename('land_cover')
         
         return classified
     
-    def _detect_water(self, image: ee.Image) -> ee.Image:
-        """
-        Detect water bodies using Modified Normalized Difference Water Index (MNDWI)
-        
-        Args:
-            image: ee.Image with spectral bands
-            
-        Returns:
-            ee.Image: Water mask
-        """
-        green = image.select('SR_B3')  # Green band
-        swir = image.select('SR_B6')   # SWIR1 band
-        
-        mndwi = green.subtract(swir).divide(green.add(swir)).rename('MNDWI')
-        
-        # Water typically has MNDWI > 0.2
-        water_mask = mndwi.gt(0.2)
-        
-        return water_mask
-    
     def calculate_vegetation_fraction(self, image: ee.Image) -> ee.Image:
         """
         Calculate vegetation fraction using NDVI
@@ -115,6 +198,25 @@ class LandCoverClassifier:
         
         return impervious_fraction.rename('impervious_fraction')
     
+    def calculate_cover_fractions(self, image: ee.Image) -> ee.Image:
+        """
+        Calculate vegetation and impervious fractions together
+        
+        Same values as calculate_vegetation_fraction and calculate_impervious_fraction,
+        derived from one shared NDVI/NDBI image so a single reduceRegion covers both.
+        
+        Args:
+            image: ee.Image with spectral bands
+            
+        Returns:
+            ee.Image: Image with 'vegetation_fraction' and 'impervious_fraction' bands
+        """
+        # Bands are NDVI, NDBI: apply both conversions in one pass
+        indices = self.gee_processor.compute_indices(image)
+        
+        return indices.add([-0.1, 0.5]).divide([0.6, 0.5]).clamp(0, 1)\
+                      .rename(['vegetation_fraction', 'impervious_fraction'])
+    
     def get_class_statistics(self, classified_image: ee.Image, 
                            region: ee.Geometry = None) -> Dict:
         """
@@ -128,7 +230,7 @@ class LandCoverClassifier:
             Dict: Statistics for each class
         """
         if region is None:
-            region = self.gee_processor.create_study_area_roi()
+            region = self.gee_processor.study_area_roi
         
         # Get pixel counts for each class
         area_stats = classified_image.reduceRegion(
@@ -138,31 +240,106 @@ class LandCoverClassifier:
             maxPixels=1e13
         )
         
-        # Get total area
-        total_area = region.area().getInfo()
-        
         # Process results
         hist = area_stats.get('land_cover').getInfo()
         
-        stats = {}
-        for class_id, pixel_count in hist.items():
-            class_name = self._get_class_name(int(class_id))
-            area_km2 = (pixel_count * ANALYSIS_PARAMS['scale']**2) / 1e6
-            percentage = (pixel_count / sum(hist.values())) * 100
+        return self._class_statistics_from_histogram(hist)
+    
+    def get_class_statistics_timeseries(self, images_by_year: Dict[int, ee.Image],
+                                        region: ee.Geometry = None) -> Dict[int, Dict]:
+        """
+        Get class statistics for a classified image per year in one request
+        
+        The yearly classifications are stacked as bands of one image, so a
+        single reduceRegion and getInfo() cover every year.
+        
+        Args:
+            images_by_year: Mapping of year to ee.Image classified land cover
+            region: Analysis region
             
-            stats[class_name] = {
-                'class_id': int(class_id),
+        Returns:
+            Dict[int, Dict]: Statistics for each class, per year
+        """
+        if region is None:
+            region = self.gee_processor.study_area_roi
+        
+        band_names = {year: f'land_cover_{year}' for year in images_by_year}
+        stacked = ee.Image.cat([
+            image.select('land_cover').rename(band_names[year])
+            for year, image in images_by_year.items()
+        ])
+        
+        # Get pixel counts for each class, one histogram per band
+        hists = stacked.reduceRegion(
+            reducer=ee.Reducer.frequencyHistogram(),
+            geometry=region,
+            scale=ANALYSIS_PARAMS['scale'],
+            maxPixels=1e13
+        ).getInfo()
+        
+        return {
+            year: self._class_statistics_from_histogram(hists.get(band_name) or {})
+            for year, band_name in band_names.items()
+        }
+    
+    def _class_statistics_from_histogram(self, hist: Dict) -> Dict:
+        """
+        Convert a land cover frequency histogram into per-class statistics
+        
+        Args:
+            hist: Pixel count per class ID, as returned by frequencyHistogram
+            
+        Returns:
+            Dict: Statistics for each class
+        """
+        if not hist:
+            return {}
+        
+        class_ids = np.fromiter(map(int, hist.keys()), dtype=np.int64, count=len(hist))
+        pixel_counts = np.fromiter(hist.values(), dtype=np.float64, count=len(hist))
+        areas_km2 = pixel_counts * (ANALYSIS_PARAMS['scale']**2 / 1e6)
+        percentages = pixel_counts * (100.0 / pixel_counts.sum())
+        
+        stats = {
+            self._get_class_name(class_id): {
+                'class_id': class_id,
                 'pixel_count': pixel_count,
                 'area_km2': area_km2,
                 'percentage': percentage
             }
+            for class_id, pixel_count, area_km2, percentage in zip(
+                class_ids.tolist(), hist.values(), areas_km2.tolist(), percentages.tolist()
+            )
+        }
         
         return stats
     
+    def get_class_statistics_batch(self, classified_images: List[ee.Image],
+                                   region: ee.Geometry = None,
+                                   max_workers: int = 8) -> List[Dict]:
+        """
+        Get class statistics for several classified images concurrently
+        
+        Each image's statistics are a blocking round-trip, so they are
+        fetched from a thread pool instead of one after another.
+        
+        Args:
+            classified_images: ee.Image classified land cover images, e.g. one per year
+            region: Analysis region
+            max_workers: Maximum number of concurrent requests
+            
+        Returns:
+            List[Dict]: Statistics for each image, in input order
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(
+                lambda classified_image: self.get_class_statistics(classified_image, region),
+                classified_images
+            ))
+    
     def _get_class_name(self, class_id: int) -> str:
         """Get class name from class ID"""
-        class_names = {v: k for k, v in CLASSIFICATION['classes'].items()}
-        return class_names.get(class_id, 'unknown')
+        return self._id_to_name.get(class_id, 'unknown')
     
     def create_classification_legend(self) -> Dict:
         """Create legend information for classification"""
@@ -2,39 +2,77 @@
 Visualization Module for Urban Sprawl Analysis
 """
 
-import folium
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
-import seaborn as sns
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
-import sys
+import csv
 import os
 
-# Add config to path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'config'))
-from settings import VISUALIZATION, CLASSIFICATION, EXPORT
+from config.settings import VISUALIZATION, CLASSIFICATION, EXPORT
+
+# Land cover display parameters: one palette entry per class ID, in ID order
+CLASS_VIS_PARAMS = {
+    'min': min(CLASSIFICATION['classes'].values()),
+    'max': max(CLASSIFICATION['classes'].values()),
+    'palette': [CLASSIFICATION['colors'][name]
+                for name in sorted(CLASSIFICATION['classes'], key=CLASSIFICATION['classes'].get)]
+}
+
+# Encoder settings per chart format. PNG trades a slightly larger file for much
+# faster zlib compression; WebP (if EXPORT['file_format'] is set to it) is both
+# faster to encode and smaller than PNG at high DPI.
+CHART_PIL_KWARGS = {
+    'png': {'compress_level': 1},
+    'webp': {'quality': 85, 'method': 4}
+}
+
+# Folium map legend, with one entry per land cover class in ID order
+_LEGEND_HTML = '''
+        <div style="position: fixed; 
+                    bottom: 50px; left: 50px; width: 200px; height: 150px; 
+                    background-color: white; border:2px solid grey; z-index:9999; 
+                    font-size:14px; padding: 10px">
+        <p><b>Land Cover Classes</b></p>
+''' + ''.join(
+    f'        <p><i class="fa fa-square" style="color:{CLASSIFICATION["colors"][name]}"></i> '
+    f'{name.replace("_", " ").title()}</p>\n'
+    for name in sorted(CLASSIFICATION['classes'], key=CLASSIFICATION['classes'].get)
+) + '''        </div>
+        '''
 
 class UrbanSprawlVisualizer:
     """Visualization tools for urban sprawl analysis"""
     
+    # The style is process-global, so it only needs applying for the first chart
+    _style_initialized = False
+    
     def __init__(self):
         """Initialize visualizer"""
-        # Set matplotlib style
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
+        # Tile URL templates per serialized image, so redrawing a map skips getMapId
+        self._tile_urls = {}
         
         # Create output directories
         self._create_output_dirs()
     
+    @classmethod
+    def _apply_style(cls):
+        """Set the matplotlib style, importing seaborn only once a chart is drawn"""
+        if not cls._style_initialized:
+            import seaborn as sns
+            
+            plt.style.use('seaborn-v0_8')
+            sns.set_palette("husl")
+            UrbanSprawlVisualizer._style_initialized = True
+    
     def _create_output_dirs(self):
         """Create output directories if they don't exist"""
         for dir_path in [EXPORT['maps_dir'], EXPORT['charts_dir'], EXPORT['metrics_dir']]:
             os.makedirs(dir_path, exist_ok=True)
     
     def create_interactive_map(self, image: 'ee.Image', title: str = "Land Cover Map",
-                             center: List[float] = None, zoom: int = None) -> folium.Map:
+                             center: List[float] = None, zoom: int = None) -> 'folium.Map':
         """
         Create interactive Folium map
         
@@ -52,35 +90,12 @@ class UrbanSprawlVisualizer:
         if zoom is None:
             zoom = VISUALIZATION['zoom_level']
         
-        # Create base map
-        m = folium.Map(location=center, zoom_start=zoom, tiles='OpenStreetMap')
-        
-        # Add image layer
-        image_url = image.getThumbURL({
-            'min': 0,
-            'max': 4,
-            'palette': ['#228B22', '#8B4513', '#4169E1', '#F4A460'],
-            'format': 'png'
-        })
-        
-        folium.raster_layers.ImageOverlay(
-            image_url,
-            bounds=[[27.6, 85.2], [27.8, 85.4]],
-            opacity=0.7,
-            name=title
-        ).add_to(m)
-        
-        # Add legend
-        legend_html = self._create_legend_html()
-        m.get_root().html.add_child(folium.Element(legend_html))
-        
-        # Add layer control
-        folium.LayerControl().add_to(m)
-        
-        return m
+        m = self._create_base_map(center, zoom)
+        self._add_ee_layer(m, image, title)
+        return self._finish_map(m)
     
     def create_comparison_map(self, image1: 'ee.Image', image2: 'ee.Image',
-                            title1: str = "Before", title2: str = "After") -> folium.Map:
+                            title1: str = "Before", title2: str = "After") -> 'folium.Map':
         """
         Create side-by-side comparison map
         
@@ -93,66 +108,57 @@ class UrbanSprawlVisualizer:
         Returns:
             folium.Map: Comparison map
         """
-        center = VISUALIZATION['map_center']
-        zoom = VISUALIZATION['zoom_level']
-        
-        # Create base map
-        m = folium.Map(location=center, zoom_start=zoom, tiles='OpenStreetMap')
-        
-        # Add first image layer
-        image1_url = image1.getThumbURL({
-            'min': 0,
-            'max': 4,
-            'palette': ['#228B22', '#8B4513', '#4169E1', '#F4A460'],
-            'format': 'png'
-        })
-        
-        folium.raster_layers.ImageOverlay(
-            image1_url,
-            bounds=[[27.6, 85.2], [27.8, 85.4]],
-            opacity=0.7,
-            name=title1
-        ).add_to(m)
+        m = self._create_base_map(VISUALIZATION['map_center'], VISUALIZATION['zoom_level'])
+        self._add_ee_layer(m, image1, title1)
+        self._add_ee_layer(m, image2, title2)
+        return self._finish_map(m)
+    
+    def _create_base_map(self, center: List[float], zoom: int) -> 'folium.Map':
+        """Create an OpenStreetMap base map"""
+        import folium
         
-        # Add second image layer
-        image2_url = image2.getThumbURL({
-            'min': 0,
-            'max': 4,
-            'palette': ['#228B22', '#8B4513', '#4169E1', '#F4A460'],
-            'format': 'png'
-        })
-        
-        folium.raster_layers.ImageOverlay(
-            image2_url,
-            bounds=[[27.6, 85.2], [27.8, 85.4]],
-            opacity=0.7,
-            name=title2
-        ).add_to(m)
+        return folium.Map(location=center, zoom_start=zoom, tiles='OpenStreetMap')
+    
+    def _add_ee_layer(self, m: 'folium.Map', image: 'ee.Image', name: str) -> None:
+        """
+        Add a classified land cover image to a Folium map as a tile layer
         
-        # Add legend
-        legend_html = self._create_legend_html()
-        m.get_root().html.add_child(folium.Element(legend_html))
+        Tiles are rendered by Earth Engine on demand as the map is viewed,
+        rather than as one full thumbnail up front. The getMapId token is
+        cached per serialized image, so an image already shown on another
+        map is added without a further request.
         
-        # Add layer control
+        Args:
+            m: folium.Map to add the layer to
+            image: ee.Image classified land cover
+            name: Layer name
+        """
+        import folium
+        
+        key = image.serialize()
+        if key not in self._tile_urls:
+            self._tile_urls[key] = image.getMapId(CLASS_VIS_PARAMS)['tile_fetcher'].url_format
+        
+        folium.raster_layers.TileLayer(
+            tiles=self._tile_urls[key],
+            attr='Google Earth Engine',
+            name=name,
+            overlay=True,
+            opacity=0.7
+        ).add_to(m)
+    
+    def _finish_map(self, m: 'folium.Map') -> 'folium.Map':
+        """Add the land cover legend and layer control to a Folium map"""
+        import folium
+        
+        m.get_root().html.add_child(folium.Element(self._create_legend_html()))
         folium.LayerControl().add_to(m)
         
         return m
     
     def _create_legend_html(self) -> str:
         """Create HTML legend for Folium map"""
-        legend_html = '''
-        <div style="position: fixed; 
-                    bottom: 50px; left: 50px; width: 200px; height: 150px; 
-                    background-color: white; border:2px solid grey; z-index:9999; 
-                    font-size:14px; padding: 10px">
-        <p><b>Land Cover Classes</b></p>
-        <p><i class="fa fa-square" style="color:#228B22"></i> Vegetation</p>
-        <p><i class="fa fa-square" style="color:#8B4513"></i> Built-up</p>
-        <p><i class="fa fa-square" style="color:#4169E1"></i> Water</p>
-        <p><i class="fa fa-square" style="color:#F4A460"></i> Bare Soil</p>
-        </div>
-        '''
-        return legend_html
+        return _LEGEND_HTML
     
     def create_land_cover_chart(self, stats: Dict, title: str = "Land Cover Distribution") -> plt.Figure:
         """
@@ -165,12 +171,16 @@ class UrbanSprawlVisualizer:
         Returns:
             plt.Figure: Matplotlib figure
         """
+        self._apply_style()
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=VISUALIZATION['figure_size'])
         
-        # Prepare data
-        labels = list(stats.keys())
-        sizes = [stats[label]['percentage'] for label in labels]
-        colors = [CLASSIFICATION['colors'][label] for label in labels]
+        # Prepare data in one pass over the statistics
+        labels, sizes, colors, areas = [], [], [], []
+        for label, class_stats in stats.items():
+            labels.append(label)
+            sizes.append(class_stats['percentage'])
+            colors.append(CLASSIFICATION['colors'][label])
+            areas.append(class_stats['area_km2'])
         
         # Pie chart
         wedges, texts, autotexts = ax1.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%',
@@ -178,7 +188,6 @@ class UrbanSprawlVisualizer:
         ax1.set_title(title)
         
         # Bar chart
-        areas = [stats[label]['area_km2'] for label in labels]
         bars = ax2.bar(labels, areas, color=colors)
         ax2.set_title('Land Cover Area (km²)')
         ax2.set_ylabel('Area (km²)')
@@ -205,10 +214,22 @@ class UrbanSprawlVisualizer:
         Returns:
             plt.Figure: Matplotlib figure
         """
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+        # Only allocate axes for the panels that have data
+        panels = [key for key in ('vegetation_changes', 'urban_expansion', 'change_matrix', 'time_series')
+                  if key in change_stats]
+        nrows, ncols = (1, max(len(panels), 1)) if len(panels) <= 2 else (2, 2)
+        self._apply_style()
+        fig, axes = plt.subplots(nrows, ncols, figsize=(15, 6 * nrows), squeeze=False)
+        axes = axes.ravel()
+        
+        # Three panels leave the 2x2 grid's last axis unused
+        for ax in axes[max(len(panels), 1):]:
+            fig.delaxes(ax)
+        panel_axes = dict(zip(panels, axes))
         
         # Vegetation changes
-        if 'vegetation_changes' in change_stats:
+        if 'vegetation_changes' in panel_axes:
+            ax = panel_axes['vegetation_changes']
             veg_changes = change_stats['vegetation_changes']
             veg_data = ['Loss', 'Gain', 'No Change']
             veg_values = [
@@ -218,12 +239,13 @@ class UrbanSprawlVisualizer:
             ]
             veg_colors = ['#d62728', '#2ca02c', '#7f7f7f']
             
-            axes[0, 0].bar(veg_data, veg_values, color=veg_colors)
-            axes[0, 0].set_title('Vegetation Changes')
-            axes[0, 0].set_ylabel('Area (km²)')
+            ax.bar(veg_data, veg_values, color=veg_colors)
+            ax.set_title('Vegetation Changes')
+            ax.set_ylabel('Area (km²)')
         
         # Urban expansion
-        if 'urban_expansion' in change_stats:
+        if 'urban_expansion' in panel_axes:
+            ax = panel_axes['urban_expansion']
             urban_changes = change_stats['urban_expansion']
             urban_data = ['Expansion', 'Decline', 'Stable']
             urban_values = [
@@ -233,30 +255,34 @@ class UrbanSprawlVisualizer:
             ]
             urban_colors = ['#ff7f0e', '#1f77b4', '#7f7f7f']
             
-            axes[0, 1].bar(urban_data, urban_values, color=urban_colors)
-            axes[0, 1].set_title('Urban Changes')
-            axes[0, 1].set_ylabel('Area (km²)')
+            ax.bar(urban_data, urban_values, color=urban_colors)
+            ax.set_title('Urban Changes')
+            ax.set_ylabel('Area (km²)')
         
         # Change matrix heatmap
-        if 'change_matrix' in change_stats:
+        if 'change_matrix' in panel_axes:
+            import seaborn as sns
+            
+            ax = panel_axes['change_matrix']
             change_matrix = change_stats['change_matrix']
-            sns.heatmap(change_matrix, annot=True, fmt='.2f', cmap='YlOrRd', ax=axes[1, 0])
-            axes[1, 0].set_title('Land Cover Change Matrix (km²)')
+            sns.heatmap(change_matrix, annot=True, fmt='.2f', cmap='YlOrRd', ax=ax)
+            ax.set_title('Land Cover Change Matrix (km²)')
         
         # Time series plot
-        if 'time_series' in change_stats:
+        if 'time_series' in panel_axes:
+            ax = panel_axes['time_series']
             time_data = change_stats['time_series']
             years = list(time_data.keys())
             veg_percentages = [time_data[year]['vegetation_percentage'] for year in years]
             urban_percentages = [time_data[year]['built_up_percentage'] for year in years]
             
-            axes[1, 1].plot(years, veg_percentages, 'o-', label='Vegetation', color='#228B22')
-            axes[1, 1].plot(years, urban_percentages, 's-', label='Built-up', color='#8B4513')
-            axes[1, 1].set_title('Land Cover Trends Over Time')
-            axes[1, 1].set_xlabel('Year')
-            axes[1, 1].set_ylabel('Percentage (%)')
-            axes[1, 1].legend()
-            axes[1, 1].grid(True, alpha=0.3)
+            ax.plot(years, veg_percentages, 'o-', label='Vegetation', color='#228B22')
+            ax.plot(years, urban_percentages, 's-', label='Built-up', color='#8B4513')
+            ax.set_title('Land Cover Trends Over Time')
+            ax.set_xlabel('Year')
+            ax.set_ylabel('Percentage (%)')
+            ax.legend()
+            ax.grid(True, alpha=0.3)
         
         plt.tight_layout()
         return fig
@@ -273,6 +299,7 @@ class UrbanSprawlVisualizer:
         Returns:
             plt.Figure: Matplotlib figure
         """
+        self._apply_style()
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=VISUALIZATION['figure_size'])
         
         # Elevation zones
@@ -304,7 +331,7 @@ class UrbanSprawlVisualizer:
         plt.tight_layout()
         return fig
     
-    def save_map(self, map_obj: folium.Map, filename: str) -> str:
+    def save_map(self, map_obj: 'folium.Map', filename: str) -> str:
         """
         Save Folium map to HTML file
         
@@ -335,7 +362,13 @@ class UrbanSprawlVisualizer:
             dpi = VISUALIZATION['dpi']
         
         filepath = os.path.join(EXPORT['charts_dir'], f"{filename}.{EXPORT['file_format']}")
-        fig.savefig(filepath, dpi=dpi, bbox_inches='tight')
+        # Charts are already laid out with tight_layout(), so skip the extra
+        # measuring render pass that bbox_inches='tight' would add
+        save_kwargs = {'dpi': dpi}
+        # Only raster formats take encoder settings; pdf/svg/ps reject pil_kwargs
+        if EXPORT['file_format'] in CHART_PIL_KWARGS:
+            save_kwargs['pil_kwargs'] = CHART_PIL_KWARGS[EXPORT['file_format']]
+        fig.savefig(filepath, **save_kwargs)
         plt.close(fig)  # Close figure to free memory
         return filepath
     
@@ -352,27 +385,35 @@ class UrbanSprawlVisualizer:
         """
         filepath = os.path.join(EXPORT['metrics_dir'], f"{filename}.csv")
         
-        # Convert nested dictionary to DataFrame
         if isinstance(data, dict):
-            # Flatten nested dictionary
+            # Flatten nested dictionary and write it as a single row
             flat_data = self._flatten_dict(data)
-            df = pd.DataFrame([flat_data])
+            with open(filepath, 'w', newline='', encoding=EXPORT['csv_encoding']) as f:
+                writer = csv.writer(f)
+                writer.writerow(flat_data.keys())
+                writer.writerow(flat_data.values())
         else:
             df = pd.DataFrame(data)
+            df.to_csv(filepath, index=False, encoding=EXPORT['csv_encoding'])
         
-        df.to_csv(filepath, index=False, encoding=EXPORT['csv_encoding'])
         return filepath
     
     def _flatten_dict(self, d: Dict, parent_key: str = '', sep: str = '_') -> Dict:
         """Flatten nested dictionary"""
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}{sep}{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(self._flatten_dict(v, new_key, sep=sep).items())
+        flat = {}
+        # Stack of (key prefix, remaining items) keeps the recursive version's key order
+        stack = [(parent_key, iter(d.items()))]
+        while stack:
+            prefix, items = stack[-1]
+            for k, v in items:
+                new_key = f"{prefix}{sep}{k}" if prefix else k
+                if isinstance(v, dict):
+                    stack.append((new_key, iter(v.items())))
+                    break
+                flat[new_key] = v
             else:
-                items.append((new_key, v))
-        return dict(items)
+                stack.pop()
+        return flat
     
     def create_summary_dashboard(self, all_stats: Dict) -> str:
         """
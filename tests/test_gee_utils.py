@@ -0,0 +1,31 @@
+"""
+Tests for the GEE processor
+"""
+
+import unittest
+from unittest import mock
+
+import ee
+
+from src.gee_utils import GEEProcessor
+
+
+class TestEnsureInitialized(unittest.TestCase):
+    """Earth Engine is initialized once per process"""
+    
+    def test_initialize_called_once_across_processors(self):
+        state = {'initialized': False}
+        
+        def fake_initialize(*args, **kwargs):
+            state['initialized'] = True
+        
+        with mock.patch.object(ee, 'Initialize', side_effect=fake_initialize) as initialize, \
+             mock.patch.object(ee.data, 'is_initialized', side_effect=lambda: state['initialized']):
+            GEEProcessor()
+            GEEProcessor()
+        
+        initialize.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()